@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -14,6 +15,12 @@ class Settings(BaseSettings):
         """Full path to the database file."""
         return self.data_dir / "eink_reader.db"
 
+    # SQLite tuning
+    db_cache_size_kib: int = 16384  # Page cache per connection
+    db_mmap_size: int = 64 * 1024 * 1024
+    db_busy_timeout_ms: int = 5000
+    db_read_connections: int = 3  # Read-only connections for page queries
+
     # App settings
     app_name: str = "E-Ink Reader"
     debug: bool = False
@@ -23,15 +30,63 @@ class Settings(BaseSettings):
 
     # Data retention (days)
     article_retention_days: int = 90
+    # Expired articles are deleted in small batches, pausing between them so other writes get in
+    cleanup_batch_size: int = 500
+    cleanup_pause_seconds: float = 0.05
+    cleanup_vacuum_pages: int = 1000  # Free pages returned to the filesystem per step; 0 disables
 
-    # Feed refresh interval (seconds)
+    # Feed refresh scheduling (seconds). Each source is polled at an interval that
+    # follows how often it publishes, within the min/max bounds; sources with no
+    # articles yet are polled every refresh_interval_seconds. The scheduler looks for
+    # due sources every refresh_check_seconds.
     refresh_interval_seconds: int = 3600  # 1 hour
+    refresh_min_interval_seconds: int = 900  # 15 minutes
+    refresh_max_interval_seconds: int = 86400  # 1 day
+    refresh_check_seconds: int = 300
+    # A failing source is retried after refresh_min_interval_seconds, doubling with each
+    # consecutive failure up to refresh_backoff_max_seconds
+    refresh_backoff_max_seconds: int = 604800  # 1 week
+
+    # Feed refresh concurrency
+    refresh_concurrency: int = 10  # Feeds fetched at once across all hosts
+    refresh_per_host_concurrency: int = 2  # Feeds fetched at once from a single host
+
+    # HTTP client for feed fetching
+    http_timeout_seconds: float = 30.0
+    http_connect_timeout_seconds: float = 10.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http2_enabled: bool = True
+
+    # Feed parsing runs in a worker pool; parse_workers caps how many feeds parse at once
+    parse_executor: Literal["thread", "process"] = "thread"
+    parse_workers: int = 2
 
     # Article content limits
     max_article_content_length: int = 50000  # 50KB
+    # Long articles are split into pages of about this many characters of HTML
+    article_page_chars: int = 3000
 
     # User key settings
     user_key_length: int = 8
+    # Key -> user lookups cached in memory, so page views skip the users query
+    user_cache_size: int = 1024
+    user_cache_ttl_seconds: float = 300.0
+
+    # Rendered home pages cached in memory, dropped when the user's data changes
+    page_cache_max_bytes: int = 8 * 1024 * 1024
+    page_cache_ttl_seconds: float = 60.0
+
+    # Response compression; smaller responses aren't worth the CPU
+    gzip_minimum_size: int = 1024
+    gzip_level: int = 6
+
+    # Article images are proxied: fetched once, grayscaled, downscaled and cached on disk
+    image_max_width: int = 600
+    image_jpeg_quality: int = 70
+    image_max_source_bytes: int = 10 * 1024 * 1024
+    image_cache_max_bytes: int = 100 * 1024 * 1024
 
 
 settings = Settings()
@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -5,6 +6,7 @@ from pathlib import Path
 import aiosqlite
 
 from app.config import settings
+from app.services.sanitize import plain_text, simplify_html
 
 # SQL schema for creating tables
 SCHEMA = """
@@ -15,16 +17,32 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- RSS/Atom Feeds
-CREATE TABLE IF NOT EXISTS feeds (
+-- RSS/Atom feed URLs, fetched and stored once however many users follow them
+CREATE TABLE IF NOT EXISTS sources (
     id INTEGER PRIMARY KEY,
-    user_id INTEGER NOT NULL,
-    url TEXT NOT NULL,
+    url TEXT UNIQUE NOT NULL,
     title TEXT,
     last_fetched TIMESTAMP,
+    etag TEXT,
+    last_modified TEXT,
+    refresh_interval INTEGER,  -- seconds, adapted to how often the source publishes
+    next_refresh_at TIMESTAMP,  -- NULL until first fetched, which makes it due right away
+    declared_interval INTEGER,  -- seconds, from the feed's <ttl> or sy:updatePeriod
+    failure_count INTEGER NOT NULL DEFAULT 0,  -- consecutive failed fetches
+    last_error TEXT,
+    backoff_until TIMESTAMP,  -- set while failing; scheduled refreshes skip the source until then
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- RSS/Atom Feeds (a user's subscription to a source)
+CREATE TABLE IF NOT EXISTS feeds (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    source_id INTEGER NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id),
-    UNIQUE(user_id, url)
+    FOREIGN KEY (source_id) REFERENCES sources(id),
+    UNIQUE(user_id, source_id)
 );
 
 -- Feed Labels (many-to-many)
@@ -35,21 +53,36 @@ CREATE TABLE IF NOT EXISTS feed_labels (
     FOREIGN KEY (feed_id) REFERENCES feeds(id) ON DELETE CASCADE
 );
 
--- Articles
+-- Articles (bodies are kept in article_content so list queries only read small rows)
 CREATE TABLE IF NOT EXISTS articles (
     id INTEGER PRIMARY KEY,
-    feed_id INTEGER NOT NULL,
+    source_id INTEGER NOT NULL,
     guid TEXT NOT NULL,
     title TEXT,
     link TEXT,
-    content TEXT,
     summary TEXT,
     published_at TIMESTAMP,
     fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (feed_id) REFERENCES feeds(id) ON DELETE CASCADE,
-    UNIQUE(feed_id, guid)
+    FOREIGN KEY (source_id) REFERENCES sources(id) ON DELETE CASCADE,
+    UNIQUE(source_id, guid)
+);
+
+-- Article bodies, read only by the single article view
+CREATE TABLE IF NOT EXISTS article_content (
+    article_id INTEGER PRIMARY KEY,
+    content TEXT,
+    processed_content TEXT,  -- content simplified for e-ink at ingest
+    page_breaks TEXT,  -- JSON offsets splitting processed_content into pages, computed at ingest
+    FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
 );
 
+-- Full-text search over article text (plain text, rowid = article id). Rows are
+-- added by insert_articles and removed with their article by the trigger below.
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, summary, body);
+CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+    DELETE FROM articles_fts WHERE rowid = old.id;
+END;
+
 -- Reading History
 CREATE TABLE IF NOT EXISTS read_articles (
     user_id INTEGER NOT NULL,
@@ -60,39 +93,244 @@ CREATE TABLE IF NOT EXISTS read_articles (
     FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
 );
 
--- Index for faster article queries
-CREATE INDEX IF NOT EXISTS idx_articles_published_at ON articles(published_at DESC);
-CREATE INDEX IF NOT EXISTS idx_articles_feed_id ON articles(feed_id);
+-- Index for faster article queries (matches the article list order)
+CREATE INDEX IF NOT EXISTS idx_articles_sort ON articles(published_at DESC, fetched_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_articles_fetched_at ON articles(fetched_at);
+CREATE INDEX IF NOT EXISTS idx_feeds_source_id ON feeds(source_id);
+CREATE INDEX IF NOT EXISTS idx_sources_next_refresh_at ON sources(next_refresh_at);
 CREATE INDEX IF NOT EXISTS idx_feed_labels_label ON feed_labels(label);
 """
 
+# Changes to bring databases created by older versions up to SCHEMA. Each entry
+# runs once, in order, and PRAGMA user_version records how many have been applied.
+# New databases are created directly from SCHEMA and skip them.
+MIGRATIONS = [
+    # 1: HTTP validators for conditional feed requests
+    """
+    ALTER TABLE feeds ADD COLUMN etag TEXT;
+    ALTER TABLE feeds ADD COLUMN last_modified TEXT;
+    """,
+    # 2: Shared sources. Feeds become subscriptions, articles are stored once per
+    # URL (keeping the oldest copy) and read history is moved onto that copy.
+    """
+    CREATE TABLE sources (
+        id INTEGER PRIMARY KEY,
+        url TEXT UNIQUE NOT NULL,
+        title TEXT,
+        last_fetched TIMESTAMP,
+        etag TEXT,
+        last_modified TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    INSERT INTO sources (url, title, last_fetched, created_at)
+    SELECT url, MAX(title), MAX(last_fetched), MIN(created_at) FROM feeds GROUP BY url;
+
+    CREATE TABLE feeds_new (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        source_id INTEGER NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (source_id) REFERENCES sources(id),
+        UNIQUE(user_id, source_id)
+    );
+    INSERT INTO feeds_new (id, user_id, source_id, created_at)
+    SELECT f.id, f.user_id, s.id, f.created_at FROM feeds f JOIN sources s ON s.url = f.url;
+
+    CREATE TABLE articles_new (
+        id INTEGER PRIMARY KEY,
+        source_id INTEGER NOT NULL,
+        guid TEXT NOT NULL,
+        title TEXT,
+        link TEXT,
+        content TEXT,
+        summary TEXT,
+        published_at TIMESTAMP,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (source_id) REFERENCES sources(id) ON DELETE CASCADE,
+        UNIQUE(source_id, guid)
+    );
+    INSERT INTO articles_new (id, source_id, guid, title, link, content, summary, published_at, fetched_at)
+    SELECT a.id, f.source_id, a.guid, a.title, a.link, a.content, a.summary, a.published_at, a.fetched_at
+    FROM articles a
+    JOIN feeds_new f ON f.id = a.feed_id
+    JOIN (
+        SELECT MIN(a.id) AS id FROM articles a JOIN feeds_new f ON f.id = a.feed_id GROUP BY f.source_id, a.guid
+    ) keep ON keep.id = a.id;
+
+    CREATE TABLE read_articles_new (
+        user_id INTEGER NOT NULL,
+        article_id INTEGER NOT NULL,
+        read_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (user_id, article_id),
+        FOREIGN KEY (user_id) REFERENCES users(id),
+        FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+    );
+    INSERT OR IGNORE INTO read_articles_new (user_id, article_id, read_at)
+    SELECT ra.user_id, n.id, ra.read_at
+    FROM read_articles ra
+    JOIN articles a ON a.id = ra.article_id
+    JOIN feeds_new f ON f.id = a.feed_id
+    JOIN articles_new n ON n.source_id = f.source_id AND n.guid = a.guid;
+
+    DROP TABLE read_articles;
+    DROP TABLE articles;
+    DROP TABLE feeds;
+    ALTER TABLE feeds_new RENAME TO feeds;
+    ALTER TABLE articles_new RENAME TO articles;
+    ALTER TABLE read_articles_new RENAME TO read_articles;
+    """,
+    # 3: Replaced by idx_articles_sort for keyset pagination
+    """
+    DROP INDEX IF EXISTS idx_articles_published_at;
+    """,
+    # 4: Sanitized content, filled in at ingest (and on first view for older articles)
+    """
+    ALTER TABLE articles ADD COLUMN processed_content TEXT;
+    """,
+    # 5: Article body pagination, computed on first view
+    """
+    ALTER TABLE articles ADD COLUMN page_breaks TEXT;
+    """,
+    # 6: Article bodies move out of the articles table, which is rebuilt without them
+    """
+    CREATE TABLE article_content (
+        article_id INTEGER PRIMARY KEY,
+        content TEXT,
+        processed_content TEXT,
+        page_breaks TEXT,
+        FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+    );
+    INSERT INTO article_content (article_id, content, processed_content, page_breaks)
+    SELECT id, content, processed_content, page_breaks FROM articles
+    WHERE content IS NOT NULL OR processed_content IS NOT NULL;
+
+    CREATE TABLE articles_new (
+        id INTEGER PRIMARY KEY,
+        source_id INTEGER NOT NULL,
+        guid TEXT NOT NULL,
+        title TEXT,
+        link TEXT,
+        summary TEXT,
+        published_at TIMESTAMP,
+        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (source_id) REFERENCES sources(id) ON DELETE CASCADE,
+        UNIQUE(source_id, guid)
+    );
+    INSERT INTO articles_new (id, source_id, guid, title, link, summary, published_at, fetched_at)
+    SELECT id, source_id, guid, title, link, summary, published_at, fetched_at FROM articles;
+    DROP TABLE articles;
+    ALTER TABLE articles_new RENAME TO articles;
+    """,
+    # 7: Full-text search. Existing articles are indexed by the same plain text as new
+    # ones, using the functions _migrate registers.
+    """
+    CREATE VIRTUAL TABLE articles_fts USING fts5(title, summary, body);
+    INSERT INTO articles_fts (rowid, title, summary, body)
+    SELECT a.id, a.title, plain_text(a.summary),
+        plain_text(COALESCE(c.processed_content, simplify_html(c.content, a.link)))
+    FROM articles a LEFT JOIN article_content c ON c.article_id = a.id;
+    """,
+    # 8: Per-source refresh schedule
+    """
+    ALTER TABLE sources ADD COLUMN refresh_interval INTEGER;
+    ALTER TABLE sources ADD COLUMN next_refresh_at TIMESTAMP;
+    """,
+    # 9: Failure tracking for back-off
+    """
+    ALTER TABLE sources ADD COLUMN failure_count INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE sources ADD COLUMN last_error TEXT;
+    ALTER TABLE sources ADD COLUMN backoff_until TIMESTAMP;
+    """,
+    # 10: Poll interval declared by the feed itself
+    """
+    ALTER TABLE sources ADD COLUMN declared_interval INTEGER;
+    """,
+]
+
 
 class Database:
+    """SQLite database with one writer connection and a pool of read-only connections.
+
+    In WAL mode readers don't block on the writer, so page queries keep running
+    while a feed refresh holds a write transaction.
+    """
+
     def __init__(self, db_path: Path | str | None = None):
         self.db_path = Path(db_path) if db_path else settings.database_path
         self._connection: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] | None = None
+        # Serializes transactions on the writer connection so concurrent tasks
+        # cannot commit or roll back each other's writes
+        self._write_lock = asyncio.Lock()
 
     async def connect(self) -> None:
-        """Initialize database connection and create tables."""
+        """Initialize database connections and create tables."""
         # Ensure the directory exists
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._connection = await aiosqlite.connect(self.db_path)
         self._connection.row_factory = aiosqlite.Row
+        # Lets cleanup shrink the file in small steps. Only takes effect on a new
+        # database (or after a manual VACUUM), so it must come before anything else.
+        await self._connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        await self._connection.execute("PRAGMA journal_mode = WAL")
+        # In WAL mode NORMAL only risks the last transactions on power loss, never corruption
+        await self._connection.execute("PRAGMA synchronous = NORMAL")
+        await self._tune(self._connection)
+        # Migrate before enabling foreign keys so table rebuilds don't cascade
+        await self._migrate()
         # Enable foreign keys
         await self._connection.execute("PRAGMA foreign_keys = ON")
+
+        self._idle_readers = asyncio.Queue()
+        for _ in range(settings.db_read_connections):
+            reader = await aiosqlite.connect(f"{self.db_path.resolve().as_uri()}?mode=ro", uri=True)
+            reader.row_factory = aiosqlite.Row
+            await self._tune(reader)
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+
+    @staticmethod
+    async def _tune(conn: aiosqlite.Connection) -> None:
+        """Apply per-connection performance settings."""
+        await conn.execute(f"PRAGMA cache_size = -{int(settings.db_cache_size_kib)}")
+        await conn.execute(f"PRAGMA mmap_size = {int(settings.db_mmap_size)}")
+        await conn.execute(f"PRAGMA busy_timeout = {int(settings.db_busy_timeout_ms)}")
+
+    async def _migrate(self) -> None:
+        """Create tables, or upgrade an existing database to the current schema."""
+        conn = self._connection
+        cursor = await conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'")
+        is_new = await cursor.fetchone() is None
+        cursor = await conn.execute("PRAGMA user_version")
+        version = 0 if is_new else (await cursor.fetchone())[0]
+
+        if not is_new:
+            # Migrations process stored HTML the way ingest does
+            await conn.create_function("plain_text", 1, plain_text, deterministic=True)
+            await conn.create_function("simplify_html", 2, simplify_html, deterministic=True)
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                await conn.executescript(f"BEGIN;\n{migration}\nPRAGMA user_version = {number};\nCOMMIT;")
+
         # Create tables
-        await self._connection.executescript(SCHEMA)
-        await self._connection.commit()
+        await conn.executescript(SCHEMA)
+        await conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        await conn.commit()
 
     async def disconnect(self) -> None:
-        """Close database connection."""
+        """Close database connections."""
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
         if self._connection:
             await self._connection.close()
             self._connection = None
 
     @property
     def connection(self) -> aiosqlite.Connection:
-        """Get the current connection."""
+        """Get the writer connection."""
         if self._connection is None:
             raise RuntimeError("Database not connected. Call connect() first.")
         return self._connection
@@ -100,12 +338,29 @@ class Database:
     @asynccontextmanager
     async def transaction(self) -> AsyncGenerator[aiosqlite.Connection, None]:
         """Context manager for database transactions."""
-        try:
+        async with self._write_lock:
+            try:
+                yield self.connection
+                await self.connection.commit()
+            except Exception:
+                await self.connection.rollback()
+                raise
+
+    @asynccontextmanager
+    async def read(self) -> AsyncGenerator[aiosqlite.Connection, None]:
+        """Borrow a read-only connection, or the writer if there is no read pool.
+
+        Readers only see committed data.
+        """
+        if not self._readers or self._idle_readers is None:
             yield self.connection
-            await self.connection.commit()
-        except Exception:
-            await self.connection.rollback()
-            raise
+            return
+
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
 
 
 # Global database instance
@@ -2,12 +2,15 @@ import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 
 from app.config import settings
 from app.database import db
-from app.routers import api, pages
+from app.routers import api, images, pages, static
+from app.services.assets import assets
+from app.services.http import http_client
 from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.workers import parse_pool
 
 # Configure logging
 logging.basicConfig(
@@ -21,10 +24,15 @@ async def lifespan(app: FastAPI):
     """Manage application lifecycle."""
     # Startup
     await db.connect()
+    assets.load()
+    await http_client.start()
+    parse_pool.start()
     start_scheduler()
     yield
     # Shutdown
     stop_scheduler()
+    parse_pool.shutdown()
+    await http_client.close()
     await db.disconnect()
 
 
@@ -33,9 +41,11 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Compress pages on the fly; static assets are served precompressed and pass through
+app.add_middleware(GZipMiddleware, minimum_size=settings.gzip_minimum_size, compresslevel=settings.gzip_level)
 
 # Include routers
+app.include_router(static.router)
+app.include_router(images.router)
 app.include_router(pages.router)
 app.include_router(api.router, prefix="/api")
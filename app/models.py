@@ -69,11 +69,16 @@ class Feed(FeedBase):
 
     id: int
     user_id: int
+    source_id: int
     title: str | None = None
     labels: list[str] = Field(default_factory=list)
     last_fetched: datetime | None = None
     created_at: datetime
     article_count: int = 0
+    # Refresh health; backoff_until is set while the feed is failing
+    failure_count: int = 0
+    last_error: str | None = None
+    backoff_until: datetime | None = None
 
 
 # ============== Article Models ==============
@@ -102,7 +107,8 @@ class Article(ArticleBase):
 class ArticleDetail(Article):
     """Article with full content for single article view."""
 
-    content: str | None = None
+    content: str | None = None  # Simplified for e-ink, safe to render as HTML
+    page_breaks: list[int] = Field(default_factory=list)  # Offsets splitting content into pages
 
 
 # ============== Pagination Models ==============
@@ -115,6 +121,9 @@ class PaginatedArticles(BaseModel):
     total_count: int
     has_prev: bool
     has_next: bool
+    # Keyset cursors for the neighbouring pages (see crud.get_articles)
+    prev_cursor: str | None = None
+    next_cursor: str | None = None
 
 
 class PaginatedFeeds(BaseModel):
@@ -1,5 +1,7 @@
 from fastapi import APIRouter
 
+from app.services.page_cache import page_cache
+
 router = APIRouter(tags=["api"])
 
 
@@ -7,3 +9,9 @@ router = APIRouter(tags=["api"])
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok"}
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Rendered page cache statistics."""
+    return {"page_cache": page_cache.stats()}
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Query, Response
+
+from app.services.images import ImageFetchError, images
+
+router = APIRouter()
+
+# A signed URL always converts to the same image, but the original may still change
+CACHE_CONTROL = "public, max-age=2592000"
+
+
+@router.get("/img/{signature}")
+async def proxied_image(signature: str, url: str = Query(...)):
+    """Serve an article image, grayscaled and downscaled for e-ink."""
+    if not images.verify(url, signature):
+        raise HTTPException(status_code=403, detail="Invalid image signature")
+    try:
+        data, media_type = await images.get(url)
+    except ImageFetchError:
+        raise HTTPException(status_code=502, detail="Image unavailable") from None
+    return Response(data, media_type=media_type, headers={"Cache-Control": CACHE_CONTROL})
@@ -1,14 +1,22 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, Form, Query, Request
+from fastapi import APIRouter, Depends, Form, HTTPException, Query, Request, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 
+from app.config import settings
 from app.database import Database, get_db
-from app.models import generate_user_key
+from app.models import User, generate_user_key
 from app.services import crud
+from app.services.assets import assets
 from app.services.feed import FeedFetchError, FeedParseError, refresh_all_feeds, refresh_feed
+from app.services.images import images
+from app.services.page_cache import page_cache
+from app.services.sanitize import split_pages
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -19,6 +27,25 @@ def get_user_key(request: Request) -> str | None:
     return request.cookies.get("user_key")
 
 
+async def get_current_user(request: Request, db: Annotated[Database, Depends(get_db)]) -> User | None:
+    """Resolve the user from the key cookie, or None if there is no valid key."""
+    user_key = get_user_key(request)
+    if not user_key:
+        return None
+    return await crud.get_user_by_key(db, user_key)
+
+
+async def require_user(user: Annotated[User | None, Depends(get_current_user)]) -> User:
+    """Resolve the user from the key cookie, redirecting to settings if there is none."""
+    if user is None:
+        raise HTTPException(status_code=302, headers={"Location": "/settings"})
+    return user
+
+
+# Dependency for pages that need a user
+CurrentUser = Annotated[User, Depends(require_user)]
+
+
 def relative_time(dt: datetime | None) -> str:
     """Convert datetime to relative time string."""
     if dt is None:
@@ -45,6 +72,47 @@ def relative_time(dt: datetime | None) -> str:
 
 # Add filter to templates
 templates.env.filters["relative_time"] = relative_time
+templates.env.globals["static_url"] = assets.url
+templates.env.filters["proxy_images"] = images.rewrite
+
+
+# ============== Conditional Requests ==============
+
+# Changes on every start, so pages rendered by an older deploy are never revalidated
+BOOT_ID = secrets.token_hex(8)
+
+
+def page_etag(request: Request, user: User) -> str:
+    """Validator for a user's page, computed without touching the database.
+
+    Covers the user's page generation (bumped on every change to what their pages
+    show), the URL and a time window, so relative times ("5m ago") still refresh.
+    """
+    window = int(time.time() // max(settings.page_cache_ttl_seconds, 1))
+    query = sorted(request.query_params.multi_items())
+    raw = f"{BOOT_ID}:{user.id}:{page_cache.generation(user.id)}:{window}:{request.url.path}:{query}"
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()}"'
+
+
+def validator_headers(etag: str) -> dict[str, str]:
+    """Caching headers for a per-user page that must be revalidated before reuse."""
+    return {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Cookie"}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match lists the ETag (weak comparison, as for GET)."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """A 304 response if the client's cached copy is still current."""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=validator_headers(etag))
+    return None
 
 
 # ============== Home Page ==============
@@ -54,26 +122,33 @@ templates.env.filters["relative_time"] = relative_time
 async def home(
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     page: int = Query(1, ge=1),
     label: str | None = Query(None),
     show_read: bool = Query(False),
+    after: str | None = Query(None),
+    before: str | None = Query(None),
 ):
     """Home page with article list."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
+    etag = page_etag(request, user)
+    if response := not_modified(request, etag):
+        return response
 
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
+    cache_key = ("home", page, label, show_read, after, before, bool(request.query_params.get("filter")))
+    body = page_cache.get(user.id, cache_key)
+    if body is not None:
+        return HTMLResponse(body, headers={"X-Cache": "HIT", **validator_headers(etag)})
+    generation = page_cache.generation(user.id)
 
     # Get articles (hide read by default, show_read=True shows them)
-    articles = await crud.get_articles(db, user.id, page=page, hide_read=not show_read, label=label)
+    articles = await crud.get_articles(
+        db, user.id, page=page, hide_read=not show_read, label=label, after=after, before=before
+    )
 
     # Get all labels for filter dropdown
     all_labels = await crud.get_all_user_labels(db, user.id)
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         request,
         "home.html",
         {
@@ -82,8 +157,39 @@ async def home(
             "current_label": label,
             "show_read": show_read,
             "page": page,
+            "after": after,
+            "before": before,
         },
     )
+    page_cache.put(user.id, cache_key, response.body, generation)
+    response.headers.update({"X-Cache": "MISS", **validator_headers(etag)})
+    return response
+
+
+# ============== Search Page ==============
+
+
+@router.get("/search", response_class=HTMLResponse)
+async def search(
+    request: Request,
+    db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
+    q: str = Query(""),
+    page: int = Query(1, ge=1),
+):
+    """Full-text search over the articles in the user's feeds."""
+    etag = page_etag(request, user)
+    if response := not_modified(request, etag):
+        return response
+
+    results = await crud.search_articles(db, user.id, q, page=page) if q.strip() else None
+
+    return templates.TemplateResponse(
+        request,
+        "search.html",
+        {"q": q, "results": results, "page": page},
+        headers=validator_headers(etag),
+    )
 
 
 # ============== Article Page ==============
@@ -94,18 +200,17 @@ async def article_detail(
     request: Request,
     article_id: int,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     page: int = Query(1, ge=1),
     label: str | None = Query(None),
     show_read: bool = Query(False),
+    after: str | None = Query(None),
+    before: str | None = Query(None),
+    part: int = Query(1, ge=1),
 ):
-    """Single article view."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
+    """Single article view, one screen-sized part of the body at a time."""
+    if response := not_modified(request, page_etag(request, user)):
+        return response
 
     article = await crud.get_article(db, article_id, user.id)
     if not article:
@@ -123,16 +228,37 @@ async def article_detail(
     back_params = []
     if page > 1:
         back_params.append(f"page={page}")
+    if after:
+        back_params.append(f"after={after}")
+    elif before:
+        back_params.append(f"before={before}")
     if label:
         back_params.append(f"label={label}")
     if show_read:
         back_params.append("show_read=true")
     back_url = "/" + ("?" + "&".join(back_params) if back_params else "")
 
+    parts = split_pages(article.content, article.page_breaks) if article.content else [None]
+    part = min(part, len(parts))
+
+    def part_url(number: int) -> str:
+        params = back_params + ([f"part={number}"] if number > 1 else [])
+        return f"/article/{article_id}" + ("?" + "&".join(params) if params else "")
+
+    # After marking as read, which may have bumped the generation
     return templates.TemplateResponse(
         request,
         "article.html",
-        {"article": article, "back_url": back_url},
+        {
+            "article": article,
+            "back_url": back_url,
+            "content": parts[part - 1],
+            "part": part,
+            "part_count": len(parts),
+            "prev_part_url": part_url(part - 1) if part > 1 else None,
+            "next_part_url": part_url(part + 1) if part < len(parts) else None,
+        },
+        headers=validator_headers(page_etag(request, user)),
     )
 
 
@@ -140,16 +266,11 @@ async def article_detail(
 async def mark_read(
     article_id: int,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     request: Request,
 ):
     """Mark article as read."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if user:
-        await crud.mark_article_read(db, user.id, article_id)
+    await crud.mark_article_read(db, user.id, article_id)
 
     referer = request.headers.get("referer", "/")
     return RedirectResponse(url=referer, status_code=302)
@@ -159,17 +280,12 @@ async def mark_read(
 async def mark_unread(
     article_id: int,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     request: Request,
     redirect: Annotated[str, Form()] = "/",
 ):
     """Mark article as unread."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if user:
-        await crud.mark_article_unread(db, user.id, article_id)
+    await crud.mark_article_unread(db, user.id, article_id)
 
     return RedirectResponse(url=redirect, status_code=302)
 
@@ -181,18 +297,11 @@ async def mark_unread(
 async def feeds_page(
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     message: str | None = Query(None),
     error: str | None = Query(None),
 ):
     """Feeds management page."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
-
     feeds = await crud.get_user_feeds(db, user.id)
 
     return templates.TemplateResponse(
@@ -211,17 +320,14 @@ async def feed_detail(
     request: Request,
     feed_id: int,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     message: str | None = Query(None),
     error: str | None = Query(None),
 ):
     """Feed detail page."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
+    etag = page_etag(request, user)
+    if response := not_modified(request, etag):
+        return response
 
     feed = await crud.get_feed(db, feed_id)
     if not feed or feed.user_id != user.id:
@@ -235,6 +341,7 @@ async def feed_detail(
             "message": message,
             "error": error,
         },
+        headers=validator_headers(etag),
     )
 
 
@@ -242,18 +349,11 @@ async def feed_detail(
 async def add_feed(
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     url: Annotated[str, Form()],
     labels: Annotated[str, Form()] = "",
 ):
     """Add a new feed."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
-
     # Parse labels
     label_list = [lbl.strip().lower() for lbl in labels.split(",") if lbl.strip()]
 
@@ -274,16 +374,9 @@ async def delete_feed(
     feed_id: int,
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
 ):
     """Delete a feed."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
-
     # Verify feed belongs to user
     feed = await crud.get_feed(db, feed_id)
     if feed and feed.user_id == user.id:
@@ -298,16 +391,9 @@ async def refresh_single_feed(
     feed_id: int,
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
 ):
     """Refresh a single feed."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
-
     feed = await crud.get_feed(db, feed_id)
     if not feed or feed.user_id != user.id:
         return RedirectResponse(url="/feeds?error=Feed+not+found", status_code=302)
@@ -323,16 +409,9 @@ async def refresh_single_feed(
 async def refresh_all(
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
 ):
     """Refresh all feeds."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
-
     results = await refresh_all_feeds(db, user.id)
     total_new = sum(v for v in results.values() if isinstance(v, int))
 
@@ -347,17 +426,10 @@ async def update_labels(
     feed_id: int,
     request: Request,
     db: Annotated[Database, Depends(get_db)],
+    user: CurrentUser,
     labels: Annotated[str, Form()] = "",
 ):
     """Update feed labels."""
-    user_key = get_user_key(request)
-    if not user_key:
-        return RedirectResponse(url="/settings", status_code=302)
-
-    user = await crud.get_user_by_key(db, user_key)
-    if not user:
-        return RedirectResponse(url="/settings", status_code=302)
-
     feed = await crud.get_feed(db, feed_id)
     if not feed or feed.user_id != user.id:
         return RedirectResponse(url="/feeds?error=Feed+not+found", status_code=302)
@@ -374,13 +446,10 @@ async def update_labels(
 @router.get("/settings", response_class=HTMLResponse)
 async def settings_page(
     request: Request,
-    db: Annotated[Database, Depends(get_db)],
+    user: Annotated[User | None, Depends(get_current_user)],
 ):
     """Settings page for user key management."""
     user_key = get_user_key(request)
-    user = None
-    if user_key:
-        user = await crud.get_user_by_key(db, user_key)
 
     return templates.TemplateResponse(
         request,
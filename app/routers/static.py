@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.routers.pages import etag_matches
+from app.services.assets import assets, choose_encoding
+
+router = APIRouter()
+
+# Fingerprinted URLs change whenever the content does
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Plain names are kept working for old pages, but must be revalidated
+REVALIDATE = "public, no-cache"
+
+
+@router.api_route("/static/{name:path}", methods=["GET", "HEAD"])
+async def static_file(name: str, request: Request):
+    """Serve a static file, precompressed when the client accepts it."""
+    found = assets.get(name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    asset, fingerprinted = found
+
+    content = asset.content
+    coding = choose_encoding(request.headers.get("accept-encoding", ""), asset.variants)
+    headers = {
+        "Cache-Control": IMMUTABLE if fingerprinted else REVALIDATE,
+        "ETag": asset.etag(coding),
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    if coding:
+        content = asset.variants[coding]
+        headers["Content-Encoding"] = coding
+    return Response(content, media_type=asset.media_type, headers=headers)
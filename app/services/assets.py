@@ -0,0 +1,117 @@
+"""Static assets, minified, precompressed and served under fingerprinted names."""
+
+import gzip
+import hashlib
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are built
+    brotli = None
+
+# Types worth compressing; images and fonts are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def minify_css(css: str) -> str:
+    """Strip comments and insignificant whitespace from CSS."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.DOTALL)
+    css = re.sub(r"\s+", " ", css)
+    # A space before ":" can be significant in selectors ("a :hover"), so keep it
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+@dataclass
+class Asset:
+    """One static file, with its precompressed variants keyed by content coding."""
+
+    name: str
+    fingerprinted_name: str
+    media_type: str
+    content: bytes
+    variants: dict[str, bytes] = field(default_factory=dict)
+
+    def etag(self, coding: str | None = None) -> str:
+        """Strong validator for the body sent with a content coding; each coding has its own."""
+        return f'"{self.fingerprinted_name}-{coding}"' if coding else f'"{self.fingerprinted_name}"'
+
+
+class AssetStore:
+    """Builds every file in the static directory once and keeps the results in memory."""
+
+    def __init__(self, directory: Path | str = "static"):
+        self.directory = Path(directory)
+        self._assets: dict[str, Asset] | None = None
+        self._by_fingerprint: dict[str, Asset] = {}
+
+    def load(self) -> None:
+        """(Re)build all assets. Called at startup, or lazily on first use."""
+        assets = {}
+        for path in sorted(self.directory.rglob("*")):
+            if path.is_file():
+                asset = self._build(path)
+                assets[asset.name] = asset
+        self._assets = assets
+        self._by_fingerprint = {asset.fingerprinted_name: asset for asset in assets.values()}
+
+    def _build(self, path: Path) -> Asset:
+        name = path.relative_to(self.directory).as_posix()
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        content = path.read_bytes()
+        if path.suffix == ".css":
+            content = minify_css(content.decode()).encode()
+
+        digest = hashlib.sha256(content).hexdigest()[:10]
+        stem, dot, suffix = name.rpartition(".")
+        fingerprinted_name = f"{stem}.{digest}.{suffix}" if dot else f"{name}.{digest}"
+
+        asset = Asset(name, fingerprinted_name, media_type, content)
+        if media_type.startswith(COMPRESSIBLE_TYPES):
+            variants = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(content, quality=11)
+            # Keep only variants that are actually smaller
+            asset.variants = {coding: data for coding, data in variants.items() if len(data) < len(content)}
+        return asset
+
+    def _loaded(self) -> dict[str, Asset]:
+        if self._assets is None:
+            self.load()
+        return self._assets  # type: ignore[return-value]
+
+    def get(self, name: str) -> tuple[Asset, bool] | None:
+        """Look up an asset by plain or fingerprinted name. Returns (asset, is_fingerprinted)."""
+        assets = self._loaded()
+        if name in self._by_fingerprint:
+            return self._by_fingerprint[name], True
+        if name in assets:
+            return assets[name], False
+        return None
+
+    def url(self, name: str) -> str:
+        """URL for a static file, fingerprinted so it can be cached forever."""
+        asset = self._loaded().get(name)
+        return f"/static/{asset.fingerprinted_name if asset else name}"
+
+
+def choose_encoding(accept_encoding: str, available: dict[str, bytes]) -> str | None:
+    """Pick the best precompressed variant the client accepts, preferring brotli."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip().removeprefix("q=")
+        if coding and q not in ("0", "0.0", "0.00", "0.000"):
+            accepted.add(coding.strip().lower())
+    for coding in ("br", "gzip"):
+        if coding in available and (coding in accepted or "*" in accepted):
+            return coding
+    return None
+
+
+# Global asset store
+assets = AssetStore()
@@ -0,0 +1,115 @@
+"""In-process cache of each user's total and unread article counts."""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import aiosqlite
+
+# (user_id, label or None for all articles, total, unread)
+CountDelta = tuple[int, str | None, int, int]
+
+
+@dataclass
+class Counts:
+    total: int
+    unread: int
+
+
+async def count_articles(conn: aiosqlite.Connection, where_sql: str, params: Iterable) -> list[CountDelta]:
+    """Count the articles matching ``where_sql`` per subscribed user, overall and per label.
+
+    ``where_sql`` may refer to ``a`` (articles) and ``f`` (feeds). Used by the write
+    paths to measure a change: the counts of the affected rows before and/or after it.
+    """
+    params = list(params)
+    cursor = await conn.execute(
+        f"""
+        SELECT f.user_id, NULL AS label, COUNT(*) AS total, COUNT(*) - COUNT(ra.article_id) AS unread
+        FROM articles a
+        JOIN feeds f ON a.source_id = f.source_id
+        LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = f.user_id
+        WHERE {where_sql}
+        GROUP BY f.user_id
+        UNION ALL
+        SELECT f.user_id, fl.label, COUNT(*), COUNT(*) - COUNT(ra.article_id)
+        FROM articles a
+        JOIN feeds f ON a.source_id = f.source_id
+        JOIN feed_labels fl ON f.id = fl.feed_id
+        LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = f.user_id
+        WHERE {where_sql}
+        GROUP BY f.user_id, fl.label
+        """,
+        params + params,
+    )
+    return [tuple(row) for row in await cursor.fetchall()]
+
+
+async def count_new_articles(conn: aiosqlite.Connection, source_id: int, new_count: int) -> list[CountDelta]:
+    """Deltas for ``new_count`` articles just added to a source, which are unread for every subscriber."""
+    cursor = await conn.execute(
+        """
+        SELECT f.user_id, fl.label
+        FROM feeds f
+        LEFT JOIN feed_labels fl ON f.id = fl.feed_id
+        WHERE f.source_id = ?
+        """,
+        (source_id,),
+    )
+    deltas: list[CountDelta] = []
+    users = set()
+    for row in await cursor.fetchall():
+        if row["user_id"] not in users:
+            users.add(row["user_id"])
+            deltas.append((row["user_id"], None, new_count, new_count))
+        if row["label"] is not None:
+            deltas.append((row["user_id"], row["label"], new_count, new_count))
+    return deltas
+
+
+class ArticleCounts:
+    """Per-(user, label) total and unread counts for the home page pager.
+
+    Counts are computed on first use and then adjusted by every write that adds,
+    removes or (un)reads articles, or changes which feeds carry a label, so page
+    views skip the COUNT over the article joins. Writers must call ``apply`` after
+    their transaction commits.
+
+    A per-user version guards against a count read on a snapshot taken before a
+    change being cached after that change was applied.
+    """
+
+    def __init__(self):
+        self._counts: dict[tuple[int, str | None], Counts] = {}
+        self._versions: dict[int, int] = {}
+
+    def version(self, user_id: int) -> int:
+        """Current version of a user's counts; read it before counting."""
+        return self._versions.get(user_id, 0)
+
+    def get(self, user_id: int, label: str | None) -> Counts | None:
+        counts = self._counts.get((user_id, label))
+        return Counts(counts.total, counts.unread) if counts else None
+
+    def put(self, user_id: int, label: str | None, counts: Counts, version: int) -> None:
+        """Cache counts read at ``version``, unless a change has been applied since."""
+        if self.version(user_id) == version:
+            self._counts[(user_id, label)] = counts
+
+    def apply(self, added: Iterable[CountDelta] = (), removed: Iterable[CountDelta] = ()) -> None:
+        """Adjust cached counts by committed changes."""
+        deltas = [*added, *((user_id, label, -total, -unread) for user_id, label, total, unread in removed)]
+        for user_id in {delta[0] for delta in deltas}:
+            self._versions[user_id] = self.version(user_id) + 1
+        for user_id, label, total, unread in deltas:
+            counts = self._counts.get((user_id, label))
+            if counts is not None:
+                counts.total += total
+                counts.unread += unread
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._versions.clear()
+
+
+# Global article count cache
+article_counts = ArticleCounts()
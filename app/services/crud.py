@@ -1,6 +1,11 @@
+import base64
+import json
+import re
 from datetime import datetime
 from math import ceil
 
+import aiosqlite
+
 from app.config import settings
 from app.database import Database
 from app.models import (
@@ -11,20 +16,32 @@ from app.models import (
     User,
     generate_user_key,
 )
+from app.services.counts import Counts, article_counts, count_articles
+from app.services.known_guids import known_guids
+from app.services.page_cache import page_cache
+from app.services.sanitize import page_layout, simplify_html
+from app.services.user_cache import user_cache
+from app.services.workers import parse_pool
 
 # ============== User Operations ==============
 
 
 async def get_user_by_key(db: Database, key: str) -> User | None:
-    """Get user by their key."""
-    cursor = await db.connection.execute(
-        "SELECT id, key, created_at FROM users WHERE key = ?",
-        (key.lower(),),
-    )
-    row = await cursor.fetchone()
-    if row:
-        return User(id=row["id"], key=row["key"], created_at=row["created_at"])
-    return None
+    """Get user by their key, from the user cache when possible."""
+    key = key.lower()
+    hit, user = user_cache.get(key)
+    if hit:
+        return user
+
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            "SELECT id, key, created_at FROM users WHERE key = ?",
+            (key,),
+        )
+        row = await cursor.fetchone()
+    user = User(id=row["id"], key=row["key"], created_at=row["created_at"]) if row else None
+    user_cache.put(key, user)
+    return user
 
 
 async def create_user(db: Database, key: str | None = None) -> User:
@@ -33,11 +50,13 @@ async def create_user(db: Database, key: str | None = None) -> User:
         key = generate_user_key()
     key = key.lower()
 
-    cursor = await db.connection.execute(
-        "INSERT INTO users (key) VALUES (?)",
-        (key,),
-    )
-    await db.connection.commit()
+    async with db.transaction() as conn:
+        cursor = await conn.execute(
+            "INSERT INTO users (key) VALUES (?)",
+            (key,),
+        )
+    # Drop a cached miss for the key
+    user_cache.invalidate(key)
 
     return User(id=cursor.lastrowid, key=key, created_at=datetime.now())
 
@@ -55,104 +74,144 @@ async def get_or_create_user(db: Database, key: str) -> User:
 
 async def get_feed_labels(db: Database, feed_id: int) -> list[str]:
     """Get labels for a feed."""
-    cursor = await db.connection.execute(
-        "SELECT label FROM feed_labels WHERE feed_id = ? ORDER BY label",
-        (feed_id,),
-    )
-    rows = await cursor.fetchall()
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            "SELECT label FROM feed_labels WHERE feed_id = ? ORDER BY label",
+            (feed_id,),
+        )
+        rows = await cursor.fetchall()
     return [row["label"] for row in rows]
 
 
+async def _load_labels(conn: aiosqlite.Connection, where_sql: str, params: tuple) -> dict[int, list[str]]:
+    """Labels of every feed matching ``where_sql`` (on ``feed_labels fl``), in one query."""
+    cursor = await conn.execute(
+        f"SELECT fl.feed_id, fl.label FROM feed_labels fl WHERE {where_sql} ORDER BY fl.label",
+        params,
+    )
+    labels: dict[int, list[str]] = {}
+    for row in await cursor.fetchall():
+        labels.setdefault(row["feed_id"], []).append(row["label"])
+    return labels
+
+
 async def set_feed_labels(db: Database, feed_id: int, labels: list[str]) -> None:
     """Set labels for a feed (replaces existing)."""
-    # Delete existing labels
-    await db.connection.execute(
-        "DELETE FROM feed_labels WHERE feed_id = ?",
-        (feed_id,),
-    )
-    # Insert new labels
-    for label in labels:
-        await db.connection.execute(
-            "INSERT INTO feed_labels (feed_id, label) VALUES (?, ?)",
-            (feed_id, label.lower()),
+    async with db.transaction() as conn:
+        before = await count_articles(conn, "f.id = ?", (feed_id,))
+        # Delete existing labels
+        await conn.execute(
+            "DELETE FROM feed_labels WHERE feed_id = ?",
+            (feed_id,),
         )
-    await db.connection.commit()
+        # Insert new labels
+        for label in labels:
+            await conn.execute(
+                "INSERT INTO feed_labels (feed_id, label) VALUES (?, ?)",
+                (feed_id, label.lower()),
+            )
+        after = await count_articles(conn, "f.id = ?", (feed_id,))
+        cursor = await conn.execute("SELECT user_id FROM feeds WHERE id = ?", (feed_id,))
+        row = await cursor.fetchone()
+
+    article_counts.apply(added=after, removed=before)
+    if row:
+        page_cache.invalidate([row["user_id"]])
 
 
 async def get_user_feeds(db: Database, user_id: int) -> list[Feed]:
     """Get all feeds for a user with article counts."""
-    cursor = await db.connection.execute(
-        """
-        SELECT
-            f.id, f.user_id, f.url, f.title, f.last_fetched, f.created_at,
-            COUNT(a.id) as article_count
-        FROM feeds f
-        LEFT JOIN articles a ON f.id = a.feed_id
-        WHERE f.user_id = ?
-        GROUP BY f.id
-        ORDER BY f.title, f.url
-        """,
-        (user_id,),
-    )
-    rows = await cursor.fetchall()
-
-    feeds = []
-    for row in rows:
-        labels = await get_feed_labels(db, row["id"])
-        feeds.append(
-            Feed(
-                id=row["id"],
-                user_id=row["user_id"],
-                url=row["url"],
-                title=row["title"],
-                labels=labels,
-                last_fetched=row["last_fetched"],
-                created_at=row["created_at"],
-                article_count=row["article_count"],
-            )
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT
+                f.id, f.user_id, f.source_id, s.url, s.title, s.last_fetched, f.created_at,
+                s.failure_count, s.last_error, s.backoff_until, COUNT(a.id) as article_count
+            FROM feeds f
+            JOIN sources s ON f.source_id = s.id
+            LEFT JOIN articles a ON f.source_id = a.source_id
+            WHERE f.user_id = ?
+            GROUP BY f.id
+            ORDER BY s.title, s.url
+            """,
+            (user_id,),
         )
-    return feeds
+        rows = await cursor.fetchall()
+        labels = await _load_labels(conn, "fl.feed_id IN (SELECT id FROM feeds WHERE user_id = ?)", (user_id,))
+
+    return [
+        Feed(
+            id=row["id"],
+            user_id=row["user_id"],
+            source_id=row["source_id"],
+            url=row["url"],
+            title=row["title"],
+            labels=labels.get(row["id"], []),
+            last_fetched=row["last_fetched"],
+            created_at=row["created_at"],
+            article_count=row["article_count"],
+            failure_count=row["failure_count"],
+            last_error=row["last_error"],
+            backoff_until=row["backoff_until"],
+        )
+        for row in rows
+    ]
 
 
 async def get_feed(db: Database, feed_id: int) -> Feed | None:
     """Get a single feed by ID."""
-    cursor = await db.connection.execute(
-        """
-        SELECT
-            f.id, f.user_id, f.url, f.title, f.last_fetched, f.created_at,
-            COUNT(a.id) as article_count
-        FROM feeds f
-        LEFT JOIN articles a ON f.id = a.feed_id
-        WHERE f.id = ?
-        GROUP BY f.id
-        """,
-        (feed_id,),
-    )
-    row = await cursor.fetchone()
-    if not row:
-        return None
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT
+                f.id, f.user_id, f.source_id, s.url, s.title, s.last_fetched, f.created_at,
+                s.failure_count, s.last_error, s.backoff_until, COUNT(a.id) as article_count
+            FROM feeds f
+            JOIN sources s ON f.source_id = s.id
+            LEFT JOIN articles a ON f.source_id = a.source_id
+            WHERE f.id = ?
+            GROUP BY f.id
+            """,
+            (feed_id,),
+        )
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        labels = await _load_labels(conn, "fl.feed_id = ?", (feed_id,))
 
-    labels = await get_feed_labels(db, row["id"])
     return Feed(
         id=row["id"],
         user_id=row["user_id"],
+        source_id=row["source_id"],
         url=row["url"],
         title=row["title"],
-        labels=labels,
+        labels=labels.get(feed_id, []),
         last_fetched=row["last_fetched"],
         created_at=row["created_at"],
         article_count=row["article_count"],
+        failure_count=row["failure_count"],
+        last_error=row["last_error"],
+        backoff_until=row["backoff_until"],
     )
 
 
 async def create_feed(db: Database, user_id: int, url: str, labels: list[str] | None = None) -> Feed:
-    """Create a new feed."""
-    cursor = await db.connection.execute(
-        "INSERT INTO feeds (user_id, url) VALUES (?, ?)",
-        (user_id, url),
-    )
-    feed_id = cursor.lastrowid
-    await db.connection.commit()
+    """Subscribe a user to a feed URL, sharing the source with other subscribers."""
+    async with db.transaction() as conn:
+        await conn.execute(
+            "INSERT INTO sources (url) VALUES (?) ON CONFLICT(url) DO NOTHING",
+            (url,),
+        )
+        cursor = await conn.execute(
+            "INSERT INTO feeds (user_id, source_id) SELECT ?, id FROM sources WHERE url = ?",
+            (user_id, url),
+        )
+        feed_id = cursor.lastrowid
+        # The source may already have articles from other subscribers
+        added = await count_articles(conn, "f.id = ?", (feed_id,))
+
+    article_counts.apply(added=added)
+    page_cache.invalidate([user_id])
 
     if labels:
         await set_feed_labels(db, feed_id, labels)
@@ -161,44 +220,111 @@ async def create_feed(db: Database, user_id: int, url: str, labels: list[str] |
 
 
 async def delete_feed(db: Database, feed_id: int) -> bool:
-    """Delete a feed and its articles."""
-    cursor = await db.connection.execute(
-        "DELETE FROM feeds WHERE id = ?",
-        (feed_id,),
-    )
-    await db.connection.commit()
-    return cursor.rowcount > 0
+    """Delete a feed, and its source and articles if no one else follows it."""
+    async with db.transaction() as conn:
+        removed = await count_articles(conn, "f.id = ?", (feed_id,))
+        cursor = await conn.execute(
+            "DELETE FROM feeds WHERE id = ? RETURNING user_id, source_id",
+            (feed_id,),
+        )
+        row = await cursor.fetchone()
+        if row:
+            await conn.execute(
+                "DELETE FROM sources WHERE id = ? AND NOT EXISTS (SELECT 1 FROM feeds WHERE source_id = ?)",
+                (row["source_id"], row["source_id"]),
+            )
+
+    article_counts.apply(removed=removed)
+    if row:
+        page_cache.invalidate([row["user_id"]])
+        # Harmless if the source is still followed: its guids are reloaded on demand
+        known_guids.forget(row["source_id"])
+    return row is not None
 
 
 async def get_all_user_labels(db: Database, user_id: int) -> list[str]:
     """Get all unique labels used by a user's feeds."""
-    cursor = await db.connection.execute(
-        """
-        SELECT DISTINCT fl.label
-        FROM feed_labels fl
-        JOIN feeds f ON fl.feed_id = f.id
-        WHERE f.user_id = ?
-        ORDER BY fl.label
-        """,
-        (user_id,),
-    )
-    rows = await cursor.fetchall()
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT DISTINCT fl.label
+            FROM feed_labels fl
+            JOIN feeds f ON fl.feed_id = f.id
+            WHERE f.user_id = ?
+            ORDER BY fl.label
+            """,
+            (user_id,),
+        )
+        rows = await cursor.fetchall()
     return [row["label"] for row in rows]
 
 
 # ============== Article Operations ==============
 
 
+def encode_cursor(published_at: str | None, fetched_at: str, article_id: int) -> str:
+    """Encode an article's sort key as an opaque, URL-safe page cursor."""
+    raw = json.dumps([published_at, fetched_at, article_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str | None, str, int] | None:
+    """Decode a page cursor, or return None if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except ValueError:
+        return None
+    if not isinstance(key, list) or len(key) != 3:
+        return None
+    published_at, fetched_at, article_id = key
+    if not (published_at is None or isinstance(published_at, str)) or not isinstance(fetched_at, str):
+        return None
+    if not isinstance(article_id, int):
+        return None
+    return published_at, fetched_at, article_id
+
+
+def _keyset_clause(key: tuple[str | None, str, int], forward: bool) -> tuple[str, list]:
+    """WHERE clause selecting rows after (forward) or before the key in list order.
+
+    List order is published_at DESC (NULLs last), then fetched_at DESC, then id DESC.
+    """
+    published_at, fetched_at, article_id = key
+    if forward:
+        if published_at is None:
+            return "(a.published_at IS NULL AND (a.fetched_at, a.id) < (?, ?))", [fetched_at, article_id]
+        return (
+            "(a.published_at < ? OR a.published_at IS NULL OR (a.published_at = ? AND (a.fetched_at, a.id) < (?, ?)))",
+            [published_at, published_at, fetched_at, article_id],
+        )
+    if published_at is None:
+        return "(a.published_at IS NOT NULL OR (a.fetched_at, a.id) > (?, ?))", [fetched_at, article_id]
+    return (
+        "(a.published_at > ? OR (a.published_at = ? AND (a.fetched_at, a.id) > (?, ?)))",
+        [published_at, published_at, fetched_at, article_id],
+    )
+
+
 async def get_articles(
     db: Database,
     user_id: int,
     page: int = 1,
     hide_read: bool = False,
     label: str | None = None,
+    after: str | None = None,
+    before: str | None = None,
 ) -> PaginatedArticles:
-    """Get paginated articles for a user."""
+    """Get paginated articles for a user.
+
+    Articles are read in list order from ``idx_articles_sort``, stopping once the
+    page is full. Pass the ``next_cursor`` of a page as ``after`` (or its
+    ``prev_cursor`` as ``before``) to fetch the neighbouring page by keyset: index
+    entries before the cursor are skipped without reading their rows, so deep
+    pages stay cheap. ``page`` is then only used for display. Without a cursor,
+    ``page`` selects the page by offset, which joins every skipped row.
+    """
     per_page = settings.articles_per_page
-    offset = (page - 1) * per_page
 
     # Build query with optional filters
     where_clauses = ["f.user_id = ?"]
@@ -213,39 +339,81 @@ async def get_articles(
 
     where_sql = " AND ".join(where_clauses)
 
-    # Get total count
-    count_sql = f"""
-        SELECT COUNT(DISTINCT a.id) as count
-        FROM articles a
-        JOIN feeds f ON a.feed_id = f.id
-        LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = ?
-        {"LEFT JOIN feed_labels fl ON f.id = fl.feed_id" if label else ""}
-        WHERE {where_sql}
-    """
-    count_params = [user_id] + params
-    cursor = await db.connection.execute(count_sql, count_params)
-    row = await cursor.fetchone()
-    total_count = row["count"]
+    # Get total count, from the cache when possible
+    label_key = label.lower() if label else None
+    counts = article_counts.get(user_id, label_key)
+    if counts is None:
+        version = article_counts.version(user_id)
+        count_sql = f"""
+            SELECT COUNT(DISTINCT a.id) as total, COUNT(DISTINCT a.id) - COUNT(DISTINCT ra.article_id) as unread
+            FROM articles a
+            JOIN feeds f ON a.source_id = f.source_id
+            LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = ?
+            {"JOIN feed_labels fl ON f.id = fl.feed_id" if label else ""}
+            WHERE f.user_id = ? {"AND fl.label = ?" if label else ""}
+        """
+        count_params = [user_id, user_id] + ([label_key] if label else [])
+        async with db.read() as conn:
+            cursor = await conn.execute(count_sql, count_params)
+            row = await cursor.fetchone()
+        counts = Counts(total=row["total"], unread=row["unread"])
+        article_counts.put(user_id, label_key, counts, version)
+    total_count = counts.unread if hide_read else counts.total
     total_pages = max(1, ceil(total_count / per_page))
 
-    # Get articles
+    # Pick the page by cursor when there is a valid one, else by offset
+    after_key = decode_cursor(after) if after else None
+    before_key = decode_cursor(before) if before and not after_key else None
+    order_sql = "a.published_at DESC NULLS LAST, a.fetched_at DESC, a.id DESC"
+    limit_sql = "LIMIT ?"
+    page_params: list = [per_page + 1]
+    if after_key:
+        clause, clause_params = _keyset_clause(after_key, forward=True)
+        where_sql += f" AND {clause}"
+        params += clause_params
+    elif before_key:
+        # Walk backwards from the cursor, then flip the rows into list order
+        clause, clause_params = _keyset_clause(before_key, forward=False)
+        where_sql += f" AND {clause}"
+        params += clause_params
+        order_sql = "a.published_at ASC NULLS FIRST, a.fetched_at ASC, a.id ASC"
+    else:
+        limit_sql = "LIMIT ? OFFSET ?"
+        page_params = [per_page + 1, (page - 1) * per_page]
+
+    # Get articles, plus one extra row to tell whether there is a further page
+    # CROSS JOIN keeps articles as the outer loop, so SQLite walks idx_articles_sort in list
+    # order and stops at the LIMIT instead of collecting and sorting all the user's articles.
+    # A user follows a source at most once and a label at most once per feed, so no row repeats.
     articles_sql = f"""
-        SELECT DISTINCT
-            a.id, a.feed_id, a.guid, a.title, a.link, a.summary,
+        SELECT
+            a.id, f.id as feed_id, a.guid, a.title, a.link, a.summary,
             a.published_at, a.fetched_at,
-            f.title as feed_title,
+            s.title as feed_title,
             CASE WHEN ra.article_id IS NOT NULL THEN 1 ELSE 0 END as is_read
         FROM articles a
-        JOIN feeds f ON a.feed_id = f.id
+        CROSS JOIN feeds f ON a.source_id = f.source_id
+        JOIN sources s ON a.source_id = s.id
         LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = ?
         {"LEFT JOIN feed_labels fl ON f.id = fl.feed_id" if label else ""}
         WHERE {where_sql}
-        ORDER BY a.published_at DESC NULLS LAST, a.fetched_at DESC
-        LIMIT ? OFFSET ?
+        ORDER BY {order_sql}
+        {limit_sql}
     """
-    articles_params = [user_id] + params + [per_page, offset]
-    cursor = await db.connection.execute(articles_sql, articles_params)
-    rows = await cursor.fetchall()
+    articles_params = [user_id] + params + page_params
+    async with db.read() as conn:
+        cursor = await conn.execute(articles_sql, articles_params)
+        rows = list(await cursor.fetchall())
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if before_key:
+        rows.reverse()
+        has_prev, has_next = has_more, True
+    elif after_key:
+        has_prev, has_next = True, has_more
+    else:
+        has_prev, has_next = page > 1, has_more
 
     articles = [
         Article(
@@ -263,6 +431,86 @@ async def get_articles(
         for row in rows
     ]
 
+    return PaginatedArticles(
+        articles=articles,
+        page=page,
+        total_pages=total_pages,
+        total_count=total_count,
+        has_prev=has_prev,
+        has_next=has_next,
+        prev_cursor=encode_cursor(rows[0]["published_at"], rows[0]["fetched_at"], rows[0]["id"]) if rows else None,
+        next_cursor=encode_cursor(rows[-1]["published_at"], rows[-1]["fetched_at"], rows[-1]["id"]) if rows else None,
+    )
+
+
+def search_query(text: str) -> str | None:
+    """FTS5 query matching every word of a search, the last one as a prefix (search-as-you-type)."""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    # Quoted, so words like AND, OR and NEAR aren't taken as operators
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+async def search_articles(db: Database, user_id: int, text: str, page: int = 1) -> PaginatedArticles:
+    """Articles from the user's feeds matching a search, best matches first.
+
+    Titles weigh most, then summaries, then bodies. Each result's summary is
+    replaced by an excerpt around the match.
+    """
+    per_page = settings.articles_per_page
+    query = search_query(text)
+    if query is None:
+        return PaginatedArticles(articles=[], page=1, total_pages=1, total_count=0, has_prev=False, has_next=False)
+
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT COUNT(*)
+            FROM articles_fts
+            JOIN articles a ON a.id = articles_fts.rowid
+            JOIN feeds f ON f.source_id = a.source_id AND f.user_id = ?
+            WHERE articles_fts MATCH ?
+            """,
+            (user_id, query),
+        )
+        total_count = (await cursor.fetchone())[0]
+        cursor = await conn.execute(
+            """
+            SELECT
+                a.id, f.id as feed_id, a.guid, a.title, a.link, a.published_at, a.fetched_at,
+                snippet(articles_fts, 2, '', '', '…', 24) as excerpt,
+                s.title as feed_title,
+                CASE WHEN ra.article_id IS NOT NULL THEN 1 ELSE 0 END as is_read
+            FROM articles_fts
+            JOIN articles a ON a.id = articles_fts.rowid
+            JOIN feeds f ON f.source_id = a.source_id AND f.user_id = ?
+            JOIN sources s ON a.source_id = s.id
+            LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = ?
+            WHERE articles_fts MATCH ?
+            ORDER BY bm25(articles_fts, 10.0, 4.0, 1.0)
+            LIMIT ? OFFSET ?
+            """,
+            (user_id, user_id, query, per_page, (page - 1) * per_page),
+        )
+        rows = await cursor.fetchall()
+
+    articles = [
+        Article(
+            id=row["id"],
+            feed_id=row["feed_id"],
+            guid=row["guid"],
+            title=row["title"],
+            link=row["link"],
+            summary=row["excerpt"] or None,
+            published_at=row["published_at"],
+            fetched_at=row["fetched_at"],
+            feed_title=row["feed_title"],
+            is_read=bool(row["is_read"]),
+        )
+        for row in rows
+    ]
+    total_pages = max(1, ceil(total_count / per_page))
     return PaginatedArticles(
         articles=articles,
         page=page,
@@ -274,32 +522,59 @@ async def get_articles(
 
 
 async def get_article(db: Database, article_id: int, user_id: int) -> ArticleDetail | None:
-    """Get a single article with full content."""
-    cursor = await db.connection.execute(
-        """
-        SELECT
-            a.id, a.feed_id, a.guid, a.title, a.link, a.content, a.summary,
-            a.published_at, a.fetched_at,
-            f.title as feed_title,
-            CASE WHEN ra.article_id IS NOT NULL THEN 1 ELSE 0 END as is_read
-        FROM articles a
-        JOIN feeds f ON a.feed_id = f.id
-        LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = ?
-        WHERE a.id = ?
-        """,
-        (user_id, article_id),
-    )
-    row = await cursor.fetchone()
+    """Get a single article with full content, if the user follows its source."""
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT
+                a.id, f.id as feed_id, a.guid, a.title, a.link, a.summary, a.published_at, a.fetched_at,
+                c.content, c.processed_content, c.page_breaks,
+                s.title as feed_title,
+                CASE WHEN ra.article_id IS NOT NULL THEN 1 ELSE 0 END as is_read
+            FROM articles a
+            JOIN feeds f ON a.source_id = f.source_id AND f.user_id = ?
+            JOIN sources s ON a.source_id = s.id
+            LEFT JOIN article_content c ON c.article_id = a.id
+            LEFT JOIN read_articles ra ON a.id = ra.article_id AND ra.user_id = ?
+            WHERE a.id = ?
+            """,
+            (user_id, user_id, article_id),
+        )
+        row = await cursor.fetchone()
     if not row:
         return None
 
+    content = row["processed_content"]
+    breaks = json.loads(row["page_breaks"]) if row["page_breaks"] else None
+    if content is None and row["content"]:
+        # Stored before ingest-time processing; simplify once and keep the result
+        content = await parse_pool.run(simplify_html, row["content"], row["link"])
+        breaks = None
+    if content is None:
+        breaks = {"breaks": []}
+    elif breaks is None or breaks["chars"] != settings.article_page_chars:
+        # Pages are normally worked out at ingest; this covers articles stored before
+        # that, or since the page size setting changed, and is written back once
+        layout = await parse_pool.run(page_layout, content, settings.article_page_chars)
+        breaks = json.loads(layout)
+        async with db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO article_content (article_id, processed_content, page_breaks) VALUES (?, ?, ?)
+                ON CONFLICT(article_id) DO UPDATE SET
+                    processed_content = excluded.processed_content, page_breaks = excluded.page_breaks
+                """,
+                (article_id, content, layout),
+            )
+
     return ArticleDetail(
         id=row["id"],
         feed_id=row["feed_id"],
         guid=row["guid"],
         title=row["title"],
         link=row["link"],
-        content=row["content"],
+        content=content,
+        page_breaks=breaks["breaks"],
         summary=row["summary"],
         published_at=row["published_at"],
         fetched_at=row["fetched_at"],
@@ -310,20 +585,32 @@ async def get_article(db: Database, article_id: int, user_id: int) -> ArticleDet
 
 async def mark_article_read(db: Database, user_id: int, article_id: int) -> None:
     """Mark an article as read."""
-    await db.connection.execute(
-        """
-        INSERT OR IGNORE INTO read_articles (user_id, article_id)
-        VALUES (?, ?)
-        """,
-        (user_id, article_id),
-    )
-    await db.connection.commit()
+    async with db.transaction() as conn:
+        before = await count_articles(conn, "a.id = ? AND f.user_id = ?", (article_id, user_id))
+        cursor = await conn.execute(
+            """
+            INSERT OR IGNORE INTO read_articles (user_id, article_id)
+            VALUES (?, ?)
+            """,
+            (user_id, article_id),
+        )
+        after = await count_articles(conn, "a.id = ? AND f.user_id = ?", (article_id, user_id))
+
+    article_counts.apply(added=after, removed=before)
+    if cursor.rowcount > 0:
+        page_cache.invalidate([user_id])
 
 
 async def mark_article_unread(db: Database, user_id: int, article_id: int) -> None:
     """Mark an article as unread."""
-    await db.connection.execute(
-        "DELETE FROM read_articles WHERE user_id = ? AND article_id = ?",
-        (user_id, article_id),
-    )
-    await db.connection.commit()
+    async with db.transaction() as conn:
+        before = await count_articles(conn, "a.id = ? AND f.user_id = ?", (article_id, user_id))
+        cursor = await conn.execute(
+            "DELETE FROM read_articles WHERE user_id = ? AND article_id = ?",
+            (user_id, article_id),
+        )
+        after = await count_articles(conn, "a.id = ? AND f.user_id = ?", (article_id, user_id))
+
+    article_counts.apply(added=after, removed=before)
+    if cursor.rowcount > 0:
+        page_cache.invalidate([user_id])
@@ -1,12 +1,38 @@
-from datetime import datetime
+import asyncio
+import dataclasses
+import json
+import logging
+import time
+from collections.abc import AsyncGenerator, Iterable
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
 from time import mktime
 from typing import Any
+from urllib.parse import urlsplit
 
+import aiosqlite
 import feedparser
 import httpx
 
 from app.config import settings
 from app.database import Database
+from app.services.counts import article_counts, count_articles, count_new_articles
+from app.services.http import build_client, http_client
+from app.services.known_guids import known_guids
+from app.services.page_cache import page_cache
+from app.services.polling import (
+    backoff_delay,
+    cache_lifetime,
+    declared_interval,
+    next_interval,
+    observed_interval,
+    retry_after,
+)
+from app.services.sanitize import page_layout, plain_text, simplify_html
+from app.services.workers import parse_pool
+
+logger = logging.getLogger(__name__)
 
 
 class FeedParseError(Exception):
@@ -16,9 +42,41 @@ class FeedParseError(Exception):
 
 
 class FeedFetchError(Exception):
-    """Raised when feed fetching fails."""
+    """Raised when feed fetching fails.
 
-    pass
+    ``retry_after`` is how many seconds the server asked us to wait, if it said.
+    """
+
+    def __init__(self, message: str, retry_after: int | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class FetchedFeed:
+    """Raw response for a feed request."""
+
+    content: str | None  # None when the server answered 304 Not Modified
+    etag: str | None = None
+    last_modified: str | None = None
+    max_age: int | None = None  # Seconds the response may be reused, from cache headers
+
+    @property
+    def not_modified(self) -> bool:
+        return self.content is None
+
+
+@dataclass
+class ParsedFeed:
+    """Normalized feed title and entries, plus the validators and polling hints for the next request."""
+
+    title: str | None
+    entries: list[dict[str, Any]] = dataclasses.field(default_factory=list)
+    etag: str | None = None
+    last_modified: str | None = None
+    not_modified: bool = False
+    max_age: int | None = None  # From the response's cache headers
+    declared_interval: int | None = None  # From the feed's <ttl> or sy:updatePeriod; None when not modified
 
 
 def parse_datetime(entry: dict[str, Any]) -> datetime | None:
@@ -59,17 +117,49 @@ def get_guid(entry: dict[str, Any]) -> str:
     return str(hash(str(entry)))
 
 
-async def fetch_feed_content(url: str) -> str:
-    """Fetch feed content from URL."""
-    async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-        try:
-            response = await client.get(url)
-            response.raise_for_status()
-            return response.text
-        except httpx.HTTPStatusError as e:
-            raise FeedFetchError(f"HTTP error {e.response.status_code}: {url}") from e
-        except httpx.RequestError as e:
-            raise FeedFetchError(f"Request failed: {e}") from e
+async def _get(client: httpx.AsyncClient, url: str, etag: str | None, last_modified: str | None) -> FetchedFeed:
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    try:
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            # Servers may omit unchanged validators on a 304
+            return FetchedFeed(
+                content=None,
+                etag=response.headers.get("ETag", etag),
+                last_modified=response.headers.get("Last-Modified", last_modified),
+                max_age=cache_lifetime(response.headers),
+            )
+        response.raise_for_status()
+        return FetchedFeed(
+            content=response.text,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            max_age=cache_lifetime(response.headers),
+        )
+    except httpx.HTTPStatusError as e:
+        # Rate limited or overloaded servers may say when to come back
+        wait = retry_after(e.response.headers.get("Retry-After")) if e.response.status_code in (429, 503) else None
+        raise FeedFetchError(f"HTTP error {e.response.status_code}: {url}", retry_after=wait) from e
+    except httpx.RequestError as e:
+        raise FeedFetchError(f"Request failed: {e}") from e
+
+
+async def fetch_feed_content(url: str, etag: str | None = None, last_modified: str | None = None) -> FetchedFeed:
+    """Fetch feed content from URL, conditionally if validators are given.
+
+    Uses the shared pooled client when the app has started it, otherwise a
+    short-lived client (e.g. in scripts and tests).
+    """
+    if http_client.is_started:
+        return await _get(http_client.client, url, etag, last_modified)
+
+    async with build_client() as client:
+        return await _get(client, url, etag, last_modified)
 
 
 def parse_feed(content: str) -> feedparser.FeedParserDict:
@@ -82,121 +172,452 @@ def parse_feed(content: str) -> feedparser.FeedParserDict:
     return feed
 
 
-async def fetch_and_parse_feed(url: str) -> tuple[str, list[dict[str, Any]]]:
-    """Fetch and parse a feed, returning (title, entries)."""
-    content = await fetch_feed_content(url)
+def make_entry(
+    guid: str,
+    title: str | None = None,
+    link: str | None = None,
+    content: str | None = None,
+    summary: str | None = None,
+    published_at: datetime | None = None,
+    base_url: str | None = None,
+) -> dict[str, Any]:
+    """Build an entry for ``insert_articles``, with its content simplified for e-ink.
+
+    Also extracts the plain text the entry is indexed by for search and splits its
+    content into pages, so none of the CPU-bound work is left for when the write
+    lock is held.
+    """
+    processed_content = simplify_html(content, link or base_url)
+    summary = summary[:500] if summary else None
+    return {
+        "guid": guid,
+        "title": title,
+        "link": link,
+        "content": content,
+        "processed_content": processed_content,
+        "summary": summary,
+        "published_at": published_at,
+        "search_summary": plain_text(summary),
+        "search_body": plain_text(processed_content),
+        "page_breaks": page_layout(processed_content, settings.article_page_chars) if processed_content else None,
+    }
+
+
+def parse_entries(content: str, url: str) -> tuple[str, list[dict[str, Any]], int | None]:
+    """Parse feed content into (title, entries, declared interval), each built by ``make_entry``.
+
+    Runs in the parse worker pool, so it must stay a picklable top-level function.
+    """
     feed = parse_feed(content)
 
     title = feed.feed.get("title", url)
-    entries = []
-
-    for entry in feed.entries:
-        entries.append(
-            {
-                "guid": get_guid(entry),
-                "title": entry.get("title"),
-                "link": entry.get("link"),
-                "content": get_content(entry),
-                "summary": entry.get("summary", "")[:500] if entry.get("summary") else None,
-                "published_at": parse_datetime(entry),
-            }
+    entries = [
+        make_entry(
+            get_guid(entry),
+            title=entry.get("title"),
+            link=entry.get("link"),
+            content=get_content(entry),
+            summary=entry.get("summary"),
+            published_at=parse_datetime(entry),
+            base_url=url,
+        )
+        for entry in feed.entries
+    ]
+
+    return title, entries, declared_interval(feed.feed)
+
+
+async def fetch_and_parse_feed(url: str, etag: str | None = None, last_modified: str | None = None) -> ParsedFeed:
+    """Fetch and parse a feed. Parsing is skipped when the feed is unchanged."""
+    fetched = await fetch_feed_content(url, etag, last_modified)
+    if fetched.not_modified:
+        return ParsedFeed(
+            title=None,
+            etag=fetched.etag,
+            last_modified=fetched.last_modified,
+            not_modified=True,
+            max_age=fetched.max_age,
         )
 
-    return title, entries
+    title, entries, declared = await parse_pool.run(parse_entries, fetched.content, url)
 
+    return ParsedFeed(
+        title=title,
+        entries=entries,
+        etag=fetched.etag,
+        last_modified=fetched.last_modified,
+        max_age=fetched.max_age,
+        declared_interval=declared,
+    )
 
-async def refresh_feed(db: Database, feed_id: int) -> int:
-    """Refresh a single feed and return number of new articles."""
+
+class RefreshLimiter:
+    """Bounds how many feeds are fetched at once, globally and per host."""
+
+    def __init__(self, concurrency: int | None = None, per_host: int | None = None):
+        self._global = asyncio.Semaphore(concurrency or settings.refresh_concurrency)
+        self._per_host = per_host or settings.refresh_per_host_concurrency
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, url: str) -> AsyncGenerator[None, None]:
+        """Hold a fetch slot for the URL's host and one from the global pool."""
+        host = (urlsplit(url).hostname or "").lower()
+        host_semaphore = self._hosts.setdefault(host, asyncio.Semaphore(self._per_host))
+        # Wait for the host slot first so queued feeds for a busy host don't hold global slots
+        async with host_semaphore, self._global:
+            yield
+
+
+# Rows per multi-row INSERT, keeping well under SQLite's bound parameter limit
+INSERT_BATCH_ROWS = 100
+
+
+async def insert_articles(conn: aiosqlite.Connection, source_id: int, entries: list[dict[str, Any]]) -> int:
+    """Insert entries in batches, skipping guids already stored. Returns number inserted.
+
+    Call inside a transaction.
+    """
+    # Only newly inserted rows come back, so bodies and the search index are written for those alone
+    new_ids: dict[str, int] = {}
+    for start in range(0, len(entries), INSERT_BATCH_ROWS):
+        batch = entries[start : start + INSERT_BATCH_ROWS]
+        cursor = await conn.execute(
+            f"""
+            INSERT INTO articles (source_id, guid, title, link, summary, published_at)
+            VALUES {",".join(["(?, ?, ?, ?, ?, ?)"] * len(batch))}
+            ON CONFLICT(source_id, guid) DO NOTHING
+            RETURNING id, guid
+            """,
+            [
+                value
+                for entry in batch
+                for value in (
+                    source_id,
+                    entry["guid"],
+                    entry["title"],
+                    entry["link"],
+                    entry["summary"],
+                    entry["published_at"],
+                )
+            ],
+        )
+        new_ids.update((row["guid"], row["id"]) for row in await cursor.fetchall())
+    if not new_ids:
+        return 0
+
+    # A guid repeated within the feed is stored from its first entry
+    new_entries: dict[str, dict[str, Any]] = {}
+    for entry in entries:
+        if entry["guid"] in new_ids:
+            new_entries.setdefault(entry["guid"], entry)
+
+    await conn.executemany(
+        "INSERT INTO article_content (article_id, content, processed_content, page_breaks) VALUES (?, ?, ?, ?)",
+        [
+            (new_ids[guid], entry["content"], entry["processed_content"], entry["page_breaks"])
+            for guid, entry in new_entries.items()
+            if entry["content"] is not None
+        ],
+    )
+    await conn.executemany(
+        "INSERT INTO articles_fts (rowid, title, summary, body) VALUES (?, ?, ?, ?)",
+        [
+            (new_ids[guid], entry["title"], entry["search_summary"], entry["search_body"])
+            for guid, entry in new_entries.items()
+        ],
+    )
+    return len(new_ids)
+
+
+async def subscribers(conn: aiosqlite.Connection, source_id: int) -> list[int]:
+    """Ids of the users subscribed to a source."""
+    cursor = await conn.execute("SELECT user_id FROM feeds WHERE source_id = ?", (source_id,))
+    return [row["user_id"] for row in await cursor.fetchall()]
+
+
+class RefreshResults(dict[int, int | str]):
+    """Results of a multi-feed refresh: id -> new_count or error.
+
+    Keyed by source id from ``refresh_sources`` and by feed id from ``refresh_feeds``.
+    ``not_modified`` holds the ids whose server answered 304 Not Modified.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.not_modified: set[int] = set()
+
+
+async def _refresh(db: Database, source_id: int, limiter: RefreshLimiter | None) -> tuple[int, bool]:
+    """Fetch a source and store its new articles, returning (new_count, not_modified)."""
     conn = db.connection
 
-    # Get feed URL
-    cursor = await conn.execute("SELECT url, title FROM feeds WHERE id = ?", (feed_id,))
+    # Get source URL and validators from the last successful fetch
+    cursor = await conn.execute(
+        "SELECT url, title, etag, last_modified, declared_interval, failure_count FROM sources WHERE id = ?",
+        (source_id,),
+    )
     row = await cursor.fetchone()
     if not row:
-        raise ValueError(f"Feed {feed_id} not found")
+        raise ValueError(f"Source {source_id} not found")
 
     url = row["url"]
     current_title = row["title"]
 
     try:
-        title, entries = await fetch_and_parse_feed(url)
-    except (FeedFetchError, FeedParseError):
-        # Update last_fetched even on failure to avoid hammering
-        await conn.execute(
-            "UPDATE feeds SET last_fetched = ? WHERE id = ?",
-            (datetime.now(), feed_id),
-        )
-        await conn.commit()
+        if limiter:
+            async with limiter.slot(url):
+                parsed = await fetch_and_parse_feed(url, row["etag"], row["last_modified"])
+        else:
+            parsed = await fetch_and_parse_feed(url, row["etag"], row["last_modified"])
+    except Exception as e:
+        # Record the failure and back off, so a dead host stops costing every cycle a timeout.
+        # Unexpected errors (a malformed URL, a parser crash) back off the same way.
+        if not isinstance(e, (FeedFetchError, FeedParseError)):
+            logger.exception(f"Unexpected error refreshing source {source_id}")
+        now = datetime.now()
+        failures = row["failure_count"] + 1
+        requested = e.retry_after if isinstance(e, FeedFetchError) else None
+        backoff_until = now + timedelta(seconds=backoff_delay(failures, requested))
+        async with db.transaction() as conn:
+            await conn.execute(
+                """
+                UPDATE sources SET last_fetched = ?, failure_count = ?, last_error = ?, backoff_until = ?,
+                    next_refresh_at = ?
+                WHERE id = ?
+                """,
+                (now, failures, str(e)[:500], backoff_until, backoff_until, source_id),
+            )
+            # The feed page shows the failure count, error and retry time
+            stale = await subscribers(conn, source_id)
+        page_cache.invalidate(stale)
+        if failures > 1:
+            logger.info(f"Source {source_id} failed {failures} times in a row, retrying after {backoff_until}")
         raise
 
-    # Update feed title if changed or not set
-    if title and title != current_title:
-        await conn.execute("UPDATE feeds SET title = ? WHERE id = ?", (title, feed_id))
-
-    # Insert new articles
-    new_count = 0
-    for entry in entries:
-        try:
+    now = datetime.now()
+    if parsed.not_modified:
+        async with db.transaction() as conn:
+            # The feed's declared interval is remembered from its last full fetch
+            observed = await observed_interval(conn, source_id, now)
+            interval = next_interval(observed, parsed.max_age, row["declared_interval"])
             await conn.execute(
                 """
-                INSERT INTO articles (feed_id, guid, title, link, content, summary, published_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                UPDATE sources SET last_fetched = ?, etag = ?, last_modified = ?, refresh_interval = ?, next_refresh_at = ?,
+                    failure_count = 0, last_error = NULL, backoff_until = NULL
+                WHERE id = ?
                 """,
-                (
-                    feed_id,
-                    entry["guid"],
-                    entry["title"],
-                    entry["link"],
-                    entry["content"],
-                    entry["summary"],
-                    entry["published_at"],
-                ),
+                (now, parsed.etag, parsed.last_modified, interval, now + timedelta(seconds=interval), source_id),
             )
-            new_count += 1
-        except Exception:
-            # Duplicate guid, skip
-            pass
-
-    # Update last_fetched
-    await conn.execute(
-        "UPDATE feeds SET last_fetched = ? WHERE id = ?",
-        (datetime.now(), feed_id),
-    )
-    await conn.commit()
+            stale = await subscribers(conn, source_id) if row["failure_count"] else []
+        page_cache.invalidate(stale)
+        return 0, True
+
+    async with db.transaction() as conn:
+        # Update feed title if changed or not set
+        title_changed = bool(parsed.title) and parsed.title != current_title
+        if title_changed:
+            await conn.execute("UPDATE sources SET title = ? WHERE id = ?", (parsed.title, source_id))
+
+        # Insert new articles; entries the source already stored never reach SQLite
+        entries = await known_guids.new_entries(conn, source_id, parsed.entries)
+        new_count = await insert_articles(conn, source_id, entries)
+        added = await count_new_articles(conn, source_id, new_count) if new_count else []
+
+        # Update last_fetched, validators for the next conditional request, and when that is due
+        observed = await observed_interval(conn, source_id, now)
+        interval = next_interval(observed, parsed.max_age, parsed.declared_interval)
+        await conn.execute(
+            """
+            UPDATE sources SET last_fetched = ?, etag = ?, last_modified = ?, refresh_interval = ?, next_refresh_at = ?,
+                declared_interval = ?, failure_count = 0, last_error = NULL, backoff_until = NULL
+            WHERE id = ?
+            """,
+            (
+                now,
+                parsed.etag,
+                parsed.last_modified,
+                interval,
+                now + timedelta(seconds=interval),
+                parsed.declared_interval,
+                source_id,
+            ),
+        )
+        # Pages showing the title or a cleared failure are stale even if nothing was added
+        if title_changed or row["failure_count"]:
+            stale = await subscribers(conn, source_id)
+        else:
+            stale = [user_id for user_id, *_ in added]
+
+    known_guids.add(source_id, (entry["guid"] for entry in entries))
+    article_counts.apply(added=added)
+    page_cache.invalidate(stale)
+    return new_count, False
+
+
+async def refresh_feed(db: Database, feed_id: int) -> int:
+    """Refresh a single feed and return number of new articles."""
+    cursor = await db.connection.execute("SELECT source_id FROM feeds WHERE id = ?", (feed_id,))
+    row = await cursor.fetchone()
+    if not row:
+        raise ValueError(f"Feed {feed_id} not found")
 
+    new_count, _ = await _refresh(db, row["source_id"], None)
     return new_count
 
 
-async def refresh_all_feeds(db: Database, user_id: int) -> dict[int, int | str]:
-    """Refresh all feeds for a user. Returns dict of feed_id -> new_count or error."""
-    conn = db.connection
+async def refresh_sources(db: Database, source_ids: Iterable[int]) -> RefreshResults:
+    """Refresh sources concurrently. Returns dict of source_id -> new_count or error.
 
-    cursor = await conn.execute("SELECT id FROM feeds WHERE user_id = ?", (user_id,))
-    feeds = await cursor.fetchall()
+    Fetching and parsing run in parallel within the configured global and per-host
+    limits; database writes are serialized through ``Database.transaction``.
+    """
+    limiter = RefreshLimiter()
+    results = RefreshResults()
 
-    results: dict[int, int | str] = {}
-    for feed in feeds:
-        feed_id = feed["id"]
+    async def refresh_one(source_id: int) -> None:
         try:
-            count = await refresh_feed(db, feed_id)
-            results[feed_id] = count
+            results[source_id], not_modified = await _refresh(db, source_id, limiter)
+            if not_modified:
+                results.not_modified.add(source_id)
         except Exception as e:
-            results[feed_id] = str(e)
+            results[source_id] = str(e)
+
+    await asyncio.gather(*(refresh_one(source_id) for source_id in set(source_ids)))
+    return results
+
+
+async def refresh_due_sources(db: Database) -> RefreshResults:
+    """Refresh the sources whose next refresh time has come.
 
+    A failing source's next refresh is put off until its back-off ends.
+    """
+    cursor = await db.connection.execute(
+        "SELECT id FROM sources WHERE next_refresh_at IS NULL OR next_refresh_at <= ?", (datetime.now(),)
+    )
+    return await refresh_sources(db, [row["id"] for row in await cursor.fetchall()])
+
+
+async def refresh_feeds(db: Database, feed_ids: Iterable[int]) -> RefreshResults:
+    """Refresh feeds, fetching each distinct source once. Returns dict of feed_id -> new_count or error."""
+    feed_ids = list(feed_ids)
+    placeholders = ",".join("?" * len(feed_ids))
+    cursor = await db.connection.execute(
+        f"SELECT id, source_id FROM feeds WHERE id IN ({placeholders})",
+        feed_ids,
+    )
+    feed_sources = {row["id"]: row["source_id"] for row in await cursor.fetchall()}
+
+    source_results = await refresh_sources(db, feed_sources.values())
+
+    results = RefreshResults()
+    for feed_id in feed_ids:
+        source_id = feed_sources.get(feed_id)
+        if source_id is None:
+            results[feed_id] = f"Feed {feed_id} not found"
+            continue
+        results[feed_id] = source_results[source_id]
+        if source_id in source_results.not_modified:
+            results.not_modified.add(feed_id)
     return results
 
 
+async def refresh_all_feeds(db: Database, user_id: int) -> RefreshResults:
+    """Refresh all feeds for a user. Returns dict of feed_id -> new_count or error.
+
+    Feeds that are backing off after failures are skipped; ``refresh_feed`` still
+    retries one on request.
+    """
+    cursor = await db.connection.execute(
+        """
+        SELECT f.id FROM feeds f JOIN sources s ON s.id = f.source_id
+        WHERE f.user_id = ? AND (s.backoff_until IS NULL OR s.backoff_until <= ?)
+        """,
+        (user_id, datetime.now()),
+    )
+    feeds = await cursor.fetchall()
+
+    return await refresh_feeds(db, [feed["id"] for feed in feeds])
+
+
 async def cleanup_old_articles(db: Database) -> int:
-    """Delete articles older than retention period. Returns count deleted."""
-    conn = db.connection
+    """Delete articles older than retention period. Returns count deleted.
 
+    Deletes in batches of ``cleanup_batch_size``, each in its own short
+    transaction, and pauses between them so page views and refreshes waiting for
+    the write lock get a turn. Afterwards, free pages are returned to the
+    filesystem (see ``reclaim_space``).
+    """
     cutoff = datetime.now().timestamp() - (settings.article_retention_days * 24 * 60 * 60)
     cutoff_dt = datetime.fromtimestamp(cutoff)
 
-    cursor = await conn.execute(
-        "DELETE FROM articles WHERE fetched_at < ?",
-        (cutoff_dt,),
-    )
-    await conn.commit()
-
-    return cursor.rowcount
+    started = time.perf_counter()
+    total = 0
+    batches = 0
+    longest = 0.0
+    while True:
+        batch_started = time.perf_counter()
+        async with db.transaction() as conn:
+            cursor = await conn.execute(
+                "SELECT id FROM articles WHERE fetched_at < ? ORDER BY fetched_at LIMIT ?",
+                (cutoff_dt, settings.cleanup_batch_size),
+            )
+            ids = [row["id"] for row in await cursor.fetchall()]
+            if not ids:
+                break
+            # The batch is passed as one JSON array rather than a placeholder per id
+            ids_json = json.dumps(ids)
+            removed = await count_articles(conn, "a.id IN (SELECT value FROM json_each(?))", (ids_json,))
+            cursor = await conn.execute(
+                "DELETE FROM articles WHERE id IN (SELECT value FROM json_each(?)) RETURNING source_id, guid",
+                (ids_json,),
+            )
+            deleted = await cursor.fetchall()
+
+        article_counts.apply(removed=removed)
+        page_cache.invalidate(user_id for user_id, *_ in removed)
+        for row in deleted:
+            known_guids.discard(row["source_id"], [row["guid"]])
+
+        elapsed = time.perf_counter() - batch_started
+        longest = max(longest, elapsed)
+        total += len(deleted)
+        batches += 1
+        logger.info(f"Cleanup: deleted {len(deleted)} articles in {elapsed * 1000:.0f} ms ({total} so far)")
+        await asyncio.sleep(settings.cleanup_pause_seconds)
+
+    if total:
+        pages = await reclaim_space(db)
+        logger.info(
+            f"Cleanup complete: {total} articles in {batches} batches, {time.perf_counter() - started:.2f} s "
+            f"(longest batch {longest * 1000:.0f} ms), {pages} free pages reclaimed"
+        )
+    return total
+
+
+async def reclaim_space(db: Database) -> int:
+    """Shrink the database file with ``PRAGMA incremental_vacuum``, a few pages at a time.
+
+    Only possible when the database uses ``auto_vacuum = INCREMENTAL``, which new
+    databases do. Returns the number of pages reclaimed.
+    """
+    if settings.cleanup_vacuum_pages <= 0:
+        return 0
+    cursor = await db.connection.execute("PRAGMA auto_vacuum")
+    if (await cursor.fetchone())[0] != 2:  # INCREMENTAL
+        return 0
+
+    reclaimed = 0
+    while True:
+        cursor = await db.connection.execute("PRAGMA freelist_count")
+        free = (await cursor.fetchone())[0]
+        if not free:
+            break
+        pages = min(free, settings.cleanup_vacuum_pages)
+        async with db.transaction() as conn:
+            # Frees one page per step, so step through all of them
+            cursor = await conn.execute(f"PRAGMA incremental_vacuum({pages})")
+            await cursor.fetchall()
+        reclaimed += pages
+        await asyncio.sleep(settings.cleanup_pause_seconds)
+    return reclaimed
@@ -0,0 +1,55 @@
+"""Shared HTTP client for feed fetching."""
+
+import httpx
+
+from app.config import settings
+
+
+def build_client() -> httpx.AsyncClient:
+    """Create an HTTP client configured from settings."""
+    return httpx.AsyncClient(
+        http2=settings.http2_enabled,
+        follow_redirects=True,
+        timeout=httpx.Timeout(
+            settings.http_timeout_seconds,
+            connect=settings.http_connect_timeout_seconds,
+        ),
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        ),
+    )
+
+
+class HttpClient:
+    """Long-lived, connection-pooled client shared by all feed fetches."""
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+
+    async def start(self) -> None:
+        """Open the connection pool."""
+        if self._client is None:
+            self._client = build_client()
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._client is not None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get the shared client."""
+        if self._client is None:
+            raise RuntimeError("HTTP client not started. Call start() first.")
+        return self._client
+
+
+# Global HTTP client instance
+http_client = HttpClient()
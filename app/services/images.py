@@ -0,0 +1,216 @@
+"""Image proxy: article images fetched once, made e-ink friendly and cached on disk."""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+import secrets
+import tempfile
+from html import unescape
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import quote
+
+import httpx
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.services.http import build_client, http_client
+from app.services.workers import parse_pool
+
+# E-ink panels show 16 shades of gray, so more levels only cost bytes
+GRAY_LEVELS = 16
+MEDIA_TYPES = {".png": "image/png", ".jpg": "image/jpeg"}
+# Image tags as written by simplify_html, which always puts src first
+IMG_SRC = re.compile(r'<img src="(https?://[^"]+)"')
+
+
+class ImageFetchError(Exception):
+    """Raised when an image can't be fetched or decoded."""
+
+    pass
+
+
+def convert_image(data: bytes, max_width: int, quality: int) -> tuple[bytes, str]:
+    """Grayscale and downscale an image. Returns (encoded bytes, media type).
+
+    Encodes both a 16-level PNG, which is smallest for diagrams and screenshots,
+    and a JPEG, which is smallest for photos, and keeps the smaller one.
+    """
+    try:
+        with Image.open(BytesIO(data)) as source:
+            # JPEGs can be decoded to grayscale at a fraction of their size, which is much faster
+            source.draft("L", (max_width, max(source.height * max_width // max(source.width, 1), 1)))
+            image = ImageOps.exif_transpose(source)
+            if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+                # Flatten onto the page's white background
+                image = Image.alpha_composite(Image.new("RGBA", image.size, "white"), image.convert("RGBA"))
+            image = image.convert("L")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageFetchError(f"Cannot decode image: {e}") from e
+
+    if image.width > max_width:
+        height = max(round(image.height * max_width / image.width), 1)
+        image = image.resize((max_width, height), Image.Resampling.LANCZOS)
+
+    png = BytesIO()
+    image.quantize(GRAY_LEVELS).save(png, "PNG", optimize=True)
+    jpeg = BytesIO()
+    image.save(jpeg, "JPEG", quality=quality, optimize=True, progressive=True)
+    if png.tell() <= jpeg.tell():
+        return png.getvalue(), "image/png"
+    return jpeg.getvalue(), "image/jpeg"
+
+
+class ImageProxy:
+    """Serves article images through signed ``/img`` URLs, converting each one once.
+
+    Converted images are stored under ``data_dir/images``, named by a hash of the
+    source URL, and the least recently served are deleted once the directory
+    grows past ``image_cache_max_bytes``. URLs are signed with a key kept in the
+    same directory, so the proxy can't be used to fetch arbitrary URLs.
+    """
+
+    def __init__(self, directory: Path | None = None, max_bytes: int | None = None):
+        self._directory = directory
+        self.max_bytes = max_bytes if max_bytes is not None else settings.image_cache_max_bytes
+        self._secret: bytes | None = None
+        self._size: int | None = None
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    @property
+    def directory(self) -> Path:
+        return self._directory or settings.data_dir / "images"
+
+    @directory.setter
+    def directory(self, value: Path | None) -> None:
+        self._directory = value
+        self.clear()
+
+    def clear(self) -> None:
+        """Forget in-memory state; the files on disk are kept."""
+        self._secret = None
+        self._size = None
+        self._locks.clear()
+
+    def _key(self) -> bytes:
+        if self._secret is None:
+            path = self.directory / ".secret"
+            if not path.exists():
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path.write_text(secrets.token_hex(32))
+            self._secret = path.read_text().strip().encode()
+        return self._secret
+
+    def sign(self, url: str) -> str:
+        return hmac.new(self._key(), url.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def verify(self, url: str, signature: str) -> bool:
+        # Compare bytes: compare_digest rejects non-ASCII strings with a TypeError
+        return hmac.compare_digest(self.sign(url).encode(), signature.encode())
+
+    def url(self, src: str) -> str:
+        """Proxy URL for an image."""
+        return f"/img/{self.sign(src)}?url={quote(src, safe='')}"
+
+    def rewrite(self, html: str | None) -> str | None:
+        """Point every image in simplified article HTML at the proxy."""
+        if not html:
+            return html
+        return IMG_SRC.sub(lambda m: f'<img src="{self.url(unescape(m.group(1)))}"', html)
+
+    async def get(self, url: str) -> tuple[bytes, str]:
+        """Return (bytes, media type) of the converted image, fetching it on first use."""
+        name = hashlib.sha256(url.encode()).hexdigest()
+        if found := await asyncio.to_thread(self._read, name):
+            return found
+
+        # Concurrent requests for the same image wait for one fetch
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        try:
+            async with lock:
+                if found := await asyncio.to_thread(self._read, name):
+                    return found
+                data = await self._fetch(url)
+                data, media_type = await parse_pool.run(
+                    convert_image, data, settings.image_max_width, settings.image_jpeg_quality
+                )
+                await asyncio.to_thread(self._store, name, data, media_type)
+                return data, media_type
+        finally:
+            if not lock.locked():
+                self._locks.pop(name, None)
+
+    def _read(self, name: str) -> tuple[bytes, str] | None:
+        for suffix, media_type in MEDIA_TYPES.items():
+            path = self.directory / f"{name}{suffix}"
+            try:
+                data = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            # The mtime records when the image was last served, for LRU eviction
+            os.utime(path)
+            return data, media_type
+        return None
+
+    async def _fetch(self, url: str) -> bytes:
+        if http_client.is_started:
+            return await self._download(http_client.client, url)
+        async with build_client() as client:
+            return await self._download(client, url)
+
+    async def _download(self, client: httpx.AsyncClient, url: str) -> bytes:
+        try:
+            async with client.stream("GET", url) as response:
+                response.raise_for_status()
+                chunks = []
+                size = 0
+                async for chunk in response.aiter_bytes():
+                    size += len(chunk)
+                    if size > settings.image_max_source_bytes:
+                        raise ImageFetchError("Image too large")
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        except httpx.HTTPError as e:
+            raise ImageFetchError(f"Failed to fetch image: {e}") from e
+
+    def _store(self, name: str, data: bytes, media_type: str) -> None:
+        suffix = next(suffix for suffix, type_ in MEDIA_TYPES.items() if type_ == media_type)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.directory / f"{name}{suffix}")
+
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def _entries(self) -> list[tuple[float, Path, int]]:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, Path(entry.path), stat.st_size))
+        return entries
+
+    def _evict(self) -> None:
+        """Delete the least recently served images until the cache fits its budget."""
+        entries = sorted(self._entries())
+        size = sum(entry[2] for entry in entries)
+        for _, path, file_size in entries:
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= file_size
+        self._size = size
+
+
+# Global image proxy instance
+images = ImageProxy()
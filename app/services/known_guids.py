@@ -0,0 +1,62 @@
+"""In-process record of the guids each source has already stored."""
+
+import hashlib
+from collections.abc import Iterable
+from typing import Any
+
+import aiosqlite
+
+
+def guid_key(guid: str) -> int:
+    """64-bit digest of a guid, much smaller to keep in memory than the guid itself.
+
+    A collision within one source would drop a new entry; at 64 bits that is
+    vanishingly unlikely for feed-sized sets.
+    """
+    return int.from_bytes(hashlib.blake2b(guid.encode(), digest_size=8).digest(), "big")
+
+
+class KnownGuids:
+    """Per-source sets of stored guids, loaded lazily from ``articles``.
+
+    Used to drop already-stored entries before they reach SQLite. Missing a guid
+    is harmless (the insert's ON CONFLICT skips it), so the sets only have to be
+    updated when rows are deleted.
+    """
+
+    def __init__(self):
+        self._sources: dict[int, set[int]] = {}
+
+    async def new_entries(
+        self, conn: aiosqlite.Connection, source_id: int, entries: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """Return the entries whose guid the source hasn't stored yet."""
+        known = self._sources.get(source_id)
+        if known is None:
+            cursor = await conn.execute("SELECT guid FROM articles WHERE source_id = ?", (source_id,))
+            known = {guid_key(row["guid"]) for row in await cursor.fetchall()}
+            self._sources[source_id] = known
+        return [entry for entry in entries if guid_key(entry["guid"]) not in known]
+
+    def add(self, source_id: int, guids: Iterable[str]) -> None:
+        """Record guids inserted for a source."""
+        known = self._sources.get(source_id)
+        if known is not None:
+            known.update(guid_key(guid) for guid in guids)
+
+    def discard(self, source_id: int, guids: Iterable[str]) -> None:
+        """Forget guids deleted from a source."""
+        known = self._sources.get(source_id)
+        if known is not None:
+            known.difference_update(guid_key(guid) for guid in guids)
+
+    def forget(self, source_id: int) -> None:
+        """Drop a source's set, e.g. when the source is deleted."""
+        self._sources.pop(source_id, None)
+
+    def clear(self) -> None:
+        self._sources.clear()
+
+
+# Global known-guid cache
+known_guids = KnownGuids()
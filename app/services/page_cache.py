@@ -0,0 +1,88 @@
+"""In-process cache of rendered pages, invalidated per user."""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable
+
+from app.config import settings
+
+
+class PageCache:
+    """LRU cache of rendered page bodies within a byte budget.
+
+    Each user has a generation counter that writers bump (``invalidate``) whenever
+    something a page shows may have changed: read state, new articles, feeds or
+    labels. Entries are stored under the generation they were rendered at, so a
+    bump makes all of the user's pages miss. Entries also expire after a TTL so
+    relative times ("5m ago") don't go stale.
+    """
+
+    def __init__(self, max_bytes: int | None = None, ttl_seconds: float | None = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.page_cache_max_bytes
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.page_cache_ttl_seconds
+        self._entries: OrderedDict[tuple[int, Hashable], tuple[int, float, bytes]] = OrderedDict()
+        self._generations: dict[int, int] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, user_id: int) -> int:
+        """Current generation of a user's pages; read it before rendering."""
+        return self._generations.get(user_id, 0)
+
+    def invalidate(self, user_ids: Iterable[int]) -> None:
+        """Bump the generation of each user and drop their cached pages."""
+        user_ids = set(user_ids)
+        for user_id in user_ids:
+            self._generations[user_id] = self.generation(user_id) + 1
+        for cache_key in [cache_key for cache_key in self._entries if cache_key[0] in user_ids]:
+            self._remove(cache_key)
+
+    def get(self, user_id: int, key: Hashable) -> bytes | None:
+        cache_key = (user_id, key)
+        entry = self._entries.get(cache_key)
+        if entry is not None:
+            generation, expires_at, body = entry
+            if generation == self.generation(user_id) and expires_at > time.monotonic():
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return body
+            self._remove(cache_key)
+        self.misses += 1
+        return None
+
+    def put(self, user_id: int, key: Hashable, body: bytes, generation: int) -> None:
+        """Cache a page rendered at ``generation``, unless the user's pages changed since."""
+        if generation != self.generation(user_id) or len(body) > self.max_bytes:
+            return
+        cache_key = (user_id, key)
+        self._remove(cache_key)
+        self._entries[cache_key] = (generation, time.monotonic() + self.ttl_seconds, body)
+        self._size += len(body)
+        while self._size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, cache_key: tuple[int, Hashable]) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self._size -= len(entry[2])
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+# Global rendered page cache
+page_cache = PageCache()
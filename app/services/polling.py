@@ -0,0 +1,127 @@
+"""When to poll each source next, from how often it publishes, what it asks for and whether it is failing."""
+
+from collections.abc import Mapping
+from datetime import UTC, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Any
+
+import aiosqlite
+
+from app.config import settings
+
+# Publishing rate is measured over this window
+RATE_WINDOW = timedelta(days=7)
+# Seconds per sy:updatePeriod (RSS syndication module)
+UPDATE_PERIODS = {"hourly": 3600, "daily": 86400, "weekly": 604800, "monthly": 2592000, "yearly": 31536000}
+
+
+def clamp_interval(seconds: float) -> int:
+    """Keep a poll interval within the configured bounds."""
+    return int(min(max(seconds, settings.refresh_min_interval_seconds), settings.refresh_max_interval_seconds))
+
+
+async def observed_interval(conn: aiosqlite.Connection, source_id: int, now: datetime) -> int:
+    """Poll interval matching a source's publishing rate, so each poll finds about one new article.
+
+    A source with no articles yet has no rate to go by and is polled at
+    ``refresh_interval_seconds``; one that published nothing within the window is
+    polled at the maximum interval.
+    """
+    cursor = await conn.execute(
+        """
+        SELECT COUNT(*) AS total, SUM(COALESCE(published_at, fetched_at) >= ?) AS recent
+        FROM articles WHERE source_id = ?
+        """,
+        (now - RATE_WINDOW, source_id),
+    )
+    row = await cursor.fetchone()
+    if not row["total"]:
+        return clamp_interval(settings.refresh_interval_seconds)
+    if not row["recent"]:
+        return settings.refresh_max_interval_seconds
+    return clamp_interval(RATE_WINDOW.total_seconds() / row["recent"])
+
+
+def next_interval(observed: int, *hints: int | None) -> int:
+    """The observed interval, stretched to the longest interval the server or feed asks for.
+
+    Hints only ever lengthen the interval, and are capped by the maximum so a feed
+    declaring a yearly schedule is still checked daily.
+    """
+    return clamp_interval(max([observed, *(hint for hint in hints if hint)]))
+
+
+def _number(value: Any) -> float | None:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def _http_date(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+
+def declared_interval(feed: Mapping[str, Any]) -> int | None:
+    """Poll interval a feed declares through RSS ``<ttl>`` (minutes) or ``sy:updatePeriod``.
+
+    Takes parsed channel metadata (feedparser's ``feed.feed``). When both are given
+    the shorter wins, so no update is missed.
+    """
+    intervals = []
+    if ttl := _number(feed.get("ttl")):
+        intervals.append(ttl * 60)
+    if period := UPDATE_PERIODS.get(str(feed.get("sy_updateperiod", "")).strip().lower()):
+        intervals.append(period / (_number(feed.get("sy_updatefrequency")) or 1))
+    return int(min(intervals)) if intervals else None
+
+
+def cache_lifetime(headers: Mapping[str, str]) -> int | None:
+    """Seconds a response may be reused, from ``Cache-Control: max-age`` or ``Expires``."""
+    directives = {}
+    for directive in headers.get("cache-control", "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        directives[name] = value.strip('"')
+    if "no-cache" in directives or "no-store" in directives:
+        return None
+    if "max-age" in directives:
+        max_age = _number(directives["max-age"])
+        return int(max_age) if max_age else None
+
+    expires = _http_date(headers.get("expires"))
+    if expires is None:
+        return None
+    date = _http_date(headers.get("date")) or datetime.now(UTC)
+    lifetime = (expires - date).total_seconds()
+    return int(lifetime) if lifetime > 0 else None
+
+
+def retry_after(value: str | None) -> int | None:
+    """Seconds to wait from a ``Retry-After`` header, given as seconds or an HTTP date."""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return int(value) or None
+    when = _http_date(value)
+    if when is None:
+        return None
+    delay = (when - datetime.now(UTC)).total_seconds()
+    return int(delay) if delay > 0 else None
+
+
+def backoff_delay(failures: int, requested: int | None = None) -> int:
+    """How long to leave a source alone after its nth consecutive failure.
+
+    Doubles with each failure, so a dead host is soon only tried about once a week
+    instead of tying up a fetch slot every cycle. A longer wait the server asked
+    for (``Retry-After``) is honored, up to the same cap.
+    """
+    delay = max(settings.refresh_min_interval_seconds * 2 ** min(failures - 1, 32), requested or 0)
+    return min(delay, settings.refresh_backoff_max_seconds)
@@ -0,0 +1,204 @@
+"""Reduce article HTML to a small subset that is safe and quick to render on e-ink."""
+
+import json
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+from itertools import pairwise
+from urllib.parse import urljoin, urlsplit
+
+# Tags kept as-is (minus attributes); everything else is unwrapped to its contents
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "em", "figcaption", "figure", "h2", "h3", "h4",
+    "hr", "i", "img", "li", "ol", "p", "pre", "strong", "sub", "sup", "ul",
+}  # fmt: skip
+# Tags dropped together with everything inside them
+DROPPED_TAGS = {
+    "audio", "button", "canvas", "embed", "form", "head", "iframe", "input", "map", "math",
+    "noscript", "object", "script", "select", "style", "svg", "template", "textarea", "video",
+}  # fmt: skip
+# Block containers outside the allow-list, which become paragraphs so their text doesn't run together
+CONTAINER_TAGS = {
+    "address", "article", "aside", "caption", "dd", "details", "div", "dt", "footer", "header",
+    "main", "section", "summary", "tr",
+}  # fmt: skip
+# Table cells, kept apart by a space within their row's paragraph
+CELL_TAGS = {"td", "th"}
+# Headings are shifted under the article title, which is the page's h1
+RENAMED_TAGS = {"h1": "h2", "h5": "h4", "h6": "h4", **dict.fromkeys(CONTAINER_TAGS, "p")}
+# Block elements, which end an open paragraph like browsers do
+BLOCK_TAGS = {"blockquote", "figure", "h2", "h3", "h4", "hr", "ol", "p", "pre", "ul"}
+# Elements that never have an end tag
+VOID_TAGS = {"area", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+ALLOWED_ATTRIBUTES = {"a": ("href",), "img": ("src", "alt")}
+ALLOWED_SCHEMES = {"http", "https", "mailto", ""}
+EMPTY_PARAGRAPH = re.compile(r"<p>\s*</p>")
+TAG = re.compile(r"<(/?)([a-z0-9]+)[^>]*>")
+ANY_TAG = re.compile(r"<[^>]*>")
+# A page may end after these top-level elements; never right after a heading
+PAGE_END_TAGS = (BLOCK_TAGS - {"h2", "h3", "h4"}) | {"br", "img"}
+# Substrings of image URLs that are known to be tracking pixels
+TRACKER_PATTERNS = (
+    "feeds.feedburner.com/~r/",
+    "feedsportal.com",
+    "pixel.wp.com",
+    "stats.wordpress.com",
+    "/__utm.gif",
+    "doubleclick.net",
+    "google-analytics.com",
+    "/open.gif",
+    "/track/",
+)
+
+
+def _is_tracker(attrs: dict[str, str]) -> bool:
+    if attrs.get("width", "").strip() in ("0", "1") or attrs.get("height", "").strip() in ("0", "1"):
+        return True
+    src = attrs.get("src", "").lower()
+    return any(pattern in src for pattern in TRACKER_PATTERNS)
+
+
+class _Simplifier(HTMLParser):
+    def __init__(self, base_url: str | None):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.out: list[str] = []
+        self.open_tags: list[str] = []
+        self.drop_depth = 0
+
+    def _url(self, value: str) -> str | None:
+        value = value.strip()
+        url = urljoin(self.base_url, value) if self.base_url else value
+        return url if urlsplit(url).scheme.lower() in ALLOWED_SCHEMES else None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.drop_depth += 1
+            return
+        if self.drop_depth:
+            return
+        if tag in CELL_TAGS and self.out and self.out[-1] != "<p>":
+            self.out.append(" ")
+        tag = RENAMED_TAGS.get(tag, tag)
+        if tag not in ALLOWED_TAGS:
+            return
+
+        values = {name: value or "" for name, value in attrs}
+        if tag == "img":
+            if _is_tracker(values):
+                return
+            # Ignore srcset and friends: the plain src is enough for a grayscale screen
+            src = self._url(values.get("src", ""))
+            if not src:
+                return
+            values["src"] = src
+        elif tag == "a" and "href" in values:
+            href = self._url(values["href"])
+            if href is None:
+                del values["href"]
+            else:
+                values["href"] = href
+
+        if tag in BLOCK_TAGS and "p" in self.open_tags:
+            self.handle_endtag("p")
+        elif tag == "li" and self.open_tags and self.open_tags[-1] == "li":
+            self.handle_endtag("li")
+
+        kept = "".join(
+            f' {name}="{escape(values[name])}"' for name in ALLOWED_ATTRIBUTES.get(tag, ()) if name in values
+        )
+        self.out.append(f"<{tag}{kept}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in DROPPED_TAGS:
+            if tag not in VOID_TAGS:
+                self.drop_depth = max(self.drop_depth - 1, 0)
+            return
+        if self.drop_depth:
+            return
+        tag = RENAMED_TAGS.get(tag, tag)
+        if tag not in self.open_tags:
+            return
+        # Close anything left open inside it, so the output is always well nested
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.out.append(f"</{open_tag}>")
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data: str) -> None:
+        if not self.drop_depth:
+            self.out.append(escape(data, quote=False))
+
+    def result(self) -> str:
+        self.close()
+        while self.open_tags:
+            self.out.append(f"</{self.open_tags.pop()}>")
+        return EMPTY_PARAGRAPH.sub("", "".join(self.out)).strip()
+
+
+def simplify_html(html: str | None, base_url: str | None = None) -> str | None:
+    """Strip scripts, styles, embeds, trackers and attributes from article HTML.
+
+    Keeps text structure (paragraphs, headings, lists, links, quotes, code and
+    images), resolves relative URLs against ``base_url`` and drops unsafe ones.
+    """
+    if not html:
+        return html
+    parser = _Simplifier(base_url)
+    parser.feed(html)
+    return parser.result()
+
+
+def plain_text(html: str | None) -> str | None:
+    """The text of an HTML fragment, with tags and extra whitespace removed, for the search index."""
+    if not html:
+        return html
+    return re.sub(r"\s+", " ", unescape(ANY_TAG.sub(" ", html))).strip()
+
+
+def page_breaks(html: str | None, budget: int) -> list[int]:
+    """Offsets at which to split simplified HTML into pages of about ``budget`` characters.
+
+    Pages only end between top-level blocks, so each one is well-formed HTML on
+    its own. A block longer than the budget gets a page to itself.
+    """
+    if not html or len(html) <= budget:
+        return []
+    breaks: list[int] = []
+    scrap = budget // 4  # Too little to be worth a page of its own at the end
+    start = 0  # Start of the current page
+    last = 0  # Latest place the current page could end
+    depth = 0
+    for match in TAG.finditer(html):
+        closing, tag = match.groups()
+        if tag not in VOID_TAGS:
+            depth = max(depth - 1, 0) if closing else depth + 1
+            if not closing:
+                continue
+        if depth or tag not in PAGE_END_TAGS:
+            continue
+        end = match.end()
+        if end - start > budget and last > start and len(html) - last > scrap:
+            breaks.append(last)
+            start = last
+        last = end
+    if len(html) - start > budget and last > start and len(html) - last > scrap:
+        breaks.append(last)
+    return breaks
+
+
+def page_layout(html: str | None, budget: int) -> str:
+    """``page_breaks`` as stored with an article, as JSON that also records the budget.
+
+    Keeping the budget lets pages be recomputed if the setting changes.
+    """
+    return json.dumps({"chars": budget, "breaks": page_breaks(html, budget)})
+
+
+def split_pages(html: str, breaks: list[int]) -> list[str]:
+    """Cut HTML at the offsets returned by ``page_breaks``."""
+    return [html[start:end] for start, end in pairwise([0, *breaks, len(html)])]
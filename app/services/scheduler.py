@@ -7,40 +7,34 @@ from apscheduler.triggers.interval import IntervalTrigger
 
 from app.config import settings
 from app.database import db
-from app.services.feed import cleanup_old_articles, refresh_all_feeds
+from app.services.feed import cleanup_old_articles, refresh_due_sources
 
 logger = logging.getLogger(__name__)
 
 scheduler = AsyncIOScheduler()
 
 
-async def refresh_all_users_feeds():
-    """Refresh feeds for all users."""
+async def refresh_due_feeds():
+    """Refresh the feeds that are due, fetching each distinct feed URL once."""
     try:
-        conn = db.connection
-        cursor = await conn.execute("SELECT id FROM users")
-        users = await cursor.fetchall()
-
-        total_new = 0
-        for user in users:
-            try:
-                results = await refresh_all_feeds(db, user["id"])
-                new_count = sum(v for v in results.values() if isinstance(v, int))
-                total_new += new_count
-            except Exception as e:
-                logger.error(f"Error refreshing feeds for user {user['id']}: {e}")
-
-        logger.info(f"Scheduled refresh complete: {total_new} new articles across {len(users)} users")
+        results = await refresh_due_sources(db)
+        if not results:
+            return
+        total_new = sum(v for v in results.values() if isinstance(v, int))
+        errors = sum(1 for v in results.values() if isinstance(v, str))
+
+        logger.info(
+            f"Scheduled refresh complete: {total_new} new articles across {len(results)} sources "
+            f"({len(results.not_modified)} not modified, {errors} failed)"
+        )
     except Exception as e:
         logger.error(f"Error in scheduled refresh: {e}")
 
 
 async def cleanup_articles():
-    """Clean up old articles."""
+    """Clean up old articles. Progress and timing are logged by the cleanup itself."""
     try:
-        deleted = await cleanup_old_articles(db)
-        if deleted > 0:
-            logger.info(f"Cleaned up {deleted} old articles")
+        await cleanup_old_articles(db)
     except Exception as e:
         logger.error(f"Error cleaning up articles: {e}")
 
@@ -49,10 +43,10 @@ def start_scheduler():
     """Start the background scheduler."""
     # Add refresh job
     scheduler.add_job(
-        refresh_all_users_feeds,
-        trigger=IntervalTrigger(seconds=settings.refresh_interval_seconds),
+        refresh_due_feeds,
+        trigger=IntervalTrigger(seconds=settings.refresh_check_seconds),
         id="refresh_feeds",
-        name="Refresh all feeds",
+        name="Refresh due feeds",
         replace_existing=True,
     )
 
@@ -66,7 +60,10 @@ def start_scheduler():
     )
 
     scheduler.start()
-    logger.info(f"Scheduler started. Feeds will refresh every {settings.refresh_interval_seconds} seconds")
+    logger.info(
+        f"Scheduler started. Feeds will refresh every {settings.refresh_min_interval_seconds} to "
+        f"{settings.refresh_max_interval_seconds} seconds, depending on how often they publish"
+    )
 
 
 def stop_scheduler():
@@ -0,0 +1,49 @@
+"""In-process cache of user key lookups."""
+
+import time
+from collections import OrderedDict
+
+from app.config import settings
+from app.models import User
+
+
+class UserCache:
+    """Maps user keys to users (or None for unknown keys), with a TTL and LRU eviction.
+
+    Users are never deleted or renamed, so the only change to invalidate is a
+    key being taken by ``create_user``. The TTL bounds how long a miss for a key
+    created by another process is remembered.
+    """
+
+    def __init__(self, max_size: int | None = None, ttl_seconds: float | None = None):
+        self.max_size = max_size or settings.user_cache_size
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.user_cache_ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, User | None]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[bool, User | None]:
+        """Return (hit, user) for a lowercased key."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, user
+
+    def put(self, key: str, user: User | None) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+# Global user cache
+user_cache = UserCache()
@@ -0,0 +1,54 @@
+"""Worker pool that keeps CPU-heavy feed parsing off the event loop."""
+
+import asyncio
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from app.config import settings
+
+T = TypeVar("T")
+
+
+class ParsePool:
+    """Runs parse jobs in a thread or process pool, at most ``parse_workers`` at once."""
+
+    def __init__(self):
+        self._executor: Executor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def start(self) -> None:
+        """Create the executor configured in settings."""
+        if self._executor is not None:
+            return
+        if settings.parse_executor == "process":
+            # spawn, not fork: the parent has aiosqlite and scheduler threads running
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=settings.parse_workers, thread_name_prefix="parse")
+        # Jobs wait here rather than in the executor queue, so a large refresh
+        # doesn't hold every downloaded feed body in memory at once
+        self._semaphore = asyncio.Semaphore(settings.parse_workers)
+
+    def shutdown(self) -> None:
+        """Stop the executor, dropping queued jobs."""
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._semaphore = None
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """Run ``func(*args)`` in the pool and return its result."""
+        if self._executor is None or self._semaphore is None:
+            # Not started (scripts, tests): still keep the work off the event loop
+            return await asyncio.to_thread(func, *args)
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+
+# Global parse pool instance
+parse_pool = ParsePool()
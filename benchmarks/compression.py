@@ -0,0 +1,111 @@
+"""Measure response compression on article pages.
+
+Renders a small, a median and a maximum-size article through the app, each on a
+single page, and reports for each the bytes on the wire and the server CPU per
+request with and without gzip. Set GZIP_LEVEL / GZIP_MINIMUM_SIZE to try other settings. The client runs
+in the same process, so the gzip CPU figure also includes decompressing the
+response and slightly overstates the server's cost.
+
+    uv run python -m benchmarks.compression [--requests 50]
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from httpx import ASGITransport, AsyncClient
+
+from app.config import settings
+from app.database import Database, get_db
+from app.main import app
+from app.services.crud import create_feed, create_user
+
+WORDS = (
+    "the reader feed article page light ink screen battery kindle library chapter note "
+    "signal network update server cache query index morning evening river mountain city "
+    "history science policy market energy climate research people government report"
+).split()
+
+
+def make_content(size: int, rng: random.Random) -> str:
+    """Article HTML of roughly ``size`` characters, as varied as real prose."""
+    paragraphs = []
+    length = 0
+    while length < size:
+        paragraph = "<p>" + " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 120))) + ".</p>\n"
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return "".join(paragraphs)[:size]
+
+
+async def measure(client: AsyncClient, url: str, user_key: str, encoding: str, requests: int) -> tuple[int, float]:
+    """Return (bytes on the wire, CPU ms per request) for an Accept-Encoding."""
+    headers = {"Accept-Encoding": encoding}
+    client.cookies.set("user_key", user_key)
+    response = await client.get(url, headers=headers)
+    wire_bytes = response.num_bytes_downloaded  # before httpx decodes the body
+
+    start = time.process_time()
+    for _ in range(requests):
+        await client.get(url, headers=headers)
+    cpu_ms = (time.process_time() - start) * 1000 / requests
+    return wire_bytes, cpu_ms
+
+
+async def main(requests: int) -> None:
+    rng = random.Random(0)
+    # Render each article as one page, so the max case really is a max-size page
+    settings.article_page_chars = settings.max_article_content_length + 1
+    sizes = {
+        "small": 2_000,
+        "median": 8_000,
+        "max": settings.max_article_content_length,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        await db.connect()
+        app.dependency_overrides[get_db] = lambda: db
+        user = await create_user(db)
+        feed = await create_feed(db, user.id, "https://example.com/rss")
+
+        article_ids = {}
+        for name, size in sizes.items():
+            cursor = await db.connection.execute(
+                "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+                (feed.source_id, name, f"A {name} article"),
+            )
+            article_ids[name] = cursor.lastrowid
+            await db.connection.execute(
+                "INSERT INTO article_content (article_id, content) VALUES (?, ?)",
+                (cursor.lastrowid, make_content(size, rng)),
+            )
+        await db.connection.commit()
+
+        print(f"gzip level {settings.gzip_level}, minimum size {settings.gzip_minimum_size} bytes")
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, article_id in article_ids.items():
+                url = f"/article/{article_id}"
+                plain_bytes, plain_cpu = await measure(client, url, user.key, "identity", requests)
+                gzip_bytes, gzip_cpu = await measure(client, url, user.key, "gzip", requests)
+                print(
+                    f"{name:>6} ({sizes[name]:>6} chars): "
+                    f"{plain_bytes:>6} -> {gzip_bytes:>6} bytes ({gzip_bytes / plain_bytes:.0%}), "
+                    f"CPU {plain_cpu:.2f} -> {gzip_cpu:.2f} ms/request"
+                )
+
+        app.dependency_overrides.clear()
+        await db.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(main(args.requests))
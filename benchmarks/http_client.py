@@ -0,0 +1,100 @@
+"""Compare per-fetch HTTP clients against the shared pooled client.
+
+Starts a local stub feed server that counts the TCP connections it accepts,
+then fetches the same set of feeds with both approaches.
+
+    uv run python -m benchmarks.http_client [--feeds 200]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.services.http import build_client
+
+FEED_BODY = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Stub</title>
+<item><title>Entry</title><guid>1</guid><link>http://localhost/1</link></item>
+</channel></rss>"""
+
+
+class StubFeedServer:
+    """Minimal keep-alive HTTP/1.1 server that serves one feed for any path."""
+
+    def __init__(self):
+        self.connections = 0
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                request = await reader.readuntil(b"\r\n\r\n")
+                if not request:
+                    break
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: application/rss+xml\r\n"
+                    b"Content-Length: " + str(len(FEED_BODY)).encode() + b"\r\n"
+                    b"Connection: keep-alive\r\n\r\n" + FEED_BODY
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def fetch_with_new_clients(urls: list[str], concurrency: int) -> None:
+    """Old behaviour: one AsyncClient per fetch."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(url: str) -> None:
+        async with semaphore, httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
+            (await client.get(url)).raise_for_status()
+
+    await asyncio.gather(*(fetch(url) for url in urls))
+
+
+async def fetch_with_shared_client(urls: list[str], concurrency: int) -> None:
+    """New behaviour: one pooled client for every fetch."""
+    semaphore = asyncio.Semaphore(concurrency)
+    async with build_client() as client:
+
+        async def fetch(url: str) -> None:
+            async with semaphore:
+                (await client.get(url)).raise_for_status()
+
+        await asyncio.gather(*(fetch(url) for url in urls))
+
+
+async def main(feeds: int, concurrency: int) -> None:
+    for name, run in (("client per fetch", fetch_with_new_clients), ("shared client", fetch_with_shared_client)):
+        server = StubFeedServer()
+        port = await server.start()
+        urls = [f"http://127.0.0.1:{port}/feed/{i}.xml" for i in range(feeds)]
+
+        start = time.perf_counter()
+        await run(urls, concurrency)
+        elapsed = time.perf_counter() - start
+        await server.stop()
+
+        print(f"{name:>17}: {feeds} fetches, {server.connections} connections opened, {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(main(args.feeds, args.concurrency))
@@ -0,0 +1,99 @@
+"""Compare per-row article inserts against the batched upsert.
+
+Stores a 500-entry feed, then stores it again unchanged (the common case on
+a scheduled refresh) and times the second pass for each approach.
+
+    uv run python -m benchmarks.ingest [--entries 500] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from app.database import Database
+from app.services.feed import insert_articles, make_entry
+
+
+def make_entries(count: int) -> list[dict]:
+    return [
+        make_entry(
+            f"https://example.com/posts/{i}",
+            title=f"Post {i}",
+            link=f"https://example.com/posts/{i}",
+            content="<p>" + "Lorem ipsum dolor sit amet. " * 40 + "</p>",
+            summary="Lorem ipsum dolor sit amet.",
+            published_at=datetime(2024, 1, 1),
+        )
+        for i in range(count)
+    ]
+
+
+async def insert_articles_per_row(conn, source_id: int, entries: list[dict]) -> int:
+    """Previous behaviour: one INSERT per entry, duplicates detected by exception."""
+    new_count = 0
+    for entry in entries:
+        try:
+            cursor = await conn.execute(
+                """
+                INSERT INTO articles (source_id, guid, title, link, summary, published_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    source_id,
+                    entry["guid"],
+                    entry["title"],
+                    entry["link"],
+                    entry["summary"],
+                    entry["published_at"],
+                ),
+            )
+            await conn.execute(
+                "INSERT INTO article_content (article_id, content, processed_content) VALUES (?, ?, ?)",
+                (cursor.lastrowid, entry["content"], entry["processed_content"]),
+            )
+            new_count += 1
+        except Exception:
+            pass
+    return new_count
+
+
+async def run(name: str, insert, entries: list[dict], rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db")
+        await db.connect()
+        cursor = await db.connection.execute("INSERT INTO sources (url) VALUES ('https://example.com/rss')")
+        source_id = cursor.lastrowid
+
+        async with db.transaction() as conn:
+            first = await insert(conn, source_id, entries)
+
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with db.transaction() as conn:
+                again = await insert(conn, source_id, entries)
+            timings.append(time.perf_counter() - start)
+        await db.disconnect()
+
+    timings.sort()
+    print(
+        f"{name:>8}: first pass {first} new, unchanged refresh {again} new, "
+        f"median {timings[len(timings) // 2] * 1000:.2f} ms, best {timings[0] * 1000:.2f} ms"
+    )
+
+
+async def main(entries: int, rounds: int) -> None:
+    feed = make_entries(entries)
+    await run("per-row", insert_articles_per_row, feed, rounds)
+    await run("batched", insert_articles, feed, rounds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.entries, args.rounds))
@@ -4,6 +4,33 @@ from pathlib import Path
 import pytest
 
 from app.database import Database
+from app.services.counts import article_counts
+from app.services.images import images
+from app.services.known_guids import known_guids
+from app.services.page_cache import page_cache
+from app.services.user_cache import user_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Reset in-process caches, which would otherwise outlive each test's database."""
+    known_guids.clear()
+    article_counts.clear()
+    user_cache.clear()
+    page_cache.clear()
+    yield
+    known_guids.clear()
+    article_counts.clear()
+    user_cache.clear()
+    page_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def image_dir(tmp_path: Path):
+    """Keep proxied images and their signing key out of the real data directory."""
+    images.directory = tmp_path / "images"
+    yield images.directory
+    images.directory = None
 
 
 @pytest.fixture
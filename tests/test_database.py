@@ -1,10 +1,22 @@
+import asyncio
+import sqlite3
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
 from datetime import datetime
+from html import escape
 
+import pytest
+
+from app.config import settings
 from app.database import Database
+from app.services import feed as feed_service
+from app.services.counts import article_counts
 from app.services.crud import (
     create_feed,
     create_user,
+    decode_cursor,
     delete_feed,
+    encode_cursor,
     get_all_user_labels,
     get_article,
     get_articles,
@@ -15,8 +27,49 @@ from app.services.crud import (
     get_user_feeds,
     mark_article_read,
     mark_article_unread,
+    search_articles,
+    search_query,
     set_feed_labels,
 )
+from app.services.feed import ParsedFeed, insert_articles, make_entry
+from app.services.user_cache import UserCache
+
+
+@asynccontextmanager
+async def count_queries(db: Database) -> AsyncGenerator[list[str], None]:
+    """Collect the SQL statements run on any of the database's connections."""
+    statements: list[str] = []
+    connections = [db.connection, *db._readers]
+    for conn in connections:
+        await conn.set_trace_callback(statements.append)
+    try:
+        yield statements
+    finally:
+        for conn in connections:
+            await conn.set_trace_callback(None)
+
+
+class TestConnections:
+    async def test_uses_wal(self, db: Database):
+        cursor = await db.connection.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+
+    async def test_reads_run_during_write_transaction(self, db: Database, user, feed):
+        async with db.transaction() as conn:
+            await conn.execute(
+                "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+                (feed.source_id, "guid1", "Pending"),
+            )
+            # The read neither waits for the writer nor sees its uncommitted row
+            pending = await asyncio.wait_for(get_articles(db, user.id), timeout=1)
+            assert pending.articles == []
+
+        assert len((await get_articles(db, user.id)).articles) == 1
+
+    async def test_readers_are_read_only(self, db: Database):
+        async with db.read() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                await conn.execute("DELETE FROM users")
 
 
 class TestUserOperations:
@@ -57,6 +110,38 @@ class TestUserOperations:
         assert user.key == "newuser1"
 
 
+class TestUserCache:
+    async def test_lookups_are_cached(self, db: Database, user):
+        await get_user_by_key(db, user.key)
+        async with count_queries(db) as queries:
+            assert (await get_user_by_key(db, user.key.upper())).id == user.id
+        assert queries == []
+
+    async def test_create_user_replaces_cached_miss(self, db: Database):
+        assert await get_user_by_key(db, "newkey") is None
+        created = await create_user(db, "newkey")
+        assert (await get_user_by_key(db, "newkey")).id == created.id
+
+    def test_entries_expire(self, monkeypatch):
+        now = 1000.0
+        monkeypatch.setattr("app.services.user_cache.time.monotonic", lambda: now)
+        cache = UserCache(max_size=10, ttl_seconds=60)
+        cache.put("key", None)
+        assert cache.get("key") == (True, None)
+        now += 61
+        assert cache.get("key") == (False, None)
+
+    def test_evicts_least_recently_used(self):
+        cache = UserCache(max_size=2, ttl_seconds=60)
+        cache.put("a", None)
+        cache.put("b", None)
+        cache.get("a")
+        cache.put("c", None)
+        assert cache.get("a")[0] is True
+        assert cache.get("b")[0] is False
+        assert cache.get("c")[0] is True
+
+
 class TestFeedOperations:
     async def test_create_feed(self, db: Database, user):
         feed = await create_feed(db, user.id, "https://example.com/rss")
@@ -84,6 +169,21 @@ class TestFeedOperations:
         feeds = await get_user_feeds(db, user.id)
         assert len(feeds) == 2
 
+    async def test_feed_queries_do_not_grow_with_feed_count(self, db: Database, user):
+        for i in range(30):
+            await create_feed(db, user.id, f"https://example{i}.com/rss", [f"label{i}", "all"] if i % 3 else [])
+
+        async with count_queries(db) as queries:
+            feeds = await get_user_feeds(db, user.id)
+        assert len(feeds) == 30
+        assert len(queries) <= 2
+
+        for feed in feeds:
+            assert feed.labels == await get_feed_labels(db, feed.id)
+            async with count_queries(db) as queries:
+                assert await get_feed(db, feed.id) == feed
+            assert len(queries) <= 2
+
     async def test_delete_feed(self, db: Database, user):
         feed = await create_feed(db, user.id, "https://todelete.com/rss")
         deleted = await delete_feed(db, feed.id)
@@ -124,17 +224,17 @@ class TestArticleOperations:
         # Insert test articles directly
         await db.connection.execute(
             """
-            INSERT INTO articles (feed_id, guid, title, link, published_at)
+            INSERT INTO articles (source_id, guid, title, link, published_at)
             VALUES (?, ?, ?, ?, ?)
             """,
-            (feed.id, "guid1", "Article 1", "https://example.com/1", datetime.now()),
+            (feed.source_id, "guid1", "Article 1", "https://example.com/1", datetime.now()),
         )
         await db.connection.execute(
             """
-            INSERT INTO articles (feed_id, guid, title, link, published_at)
+            INSERT INTO articles (source_id, guid, title, link, published_at)
             VALUES (?, ?, ?, ?, ?)
             """,
-            (feed.id, "guid2", "Article 2", "https://example.com/2", datetime.now()),
+            (feed.source_id, "guid2", "Article 2", "https://example.com/2", datetime.now()),
         )
         await db.connection.commit()
 
@@ -147,10 +247,10 @@ class TestArticleOperations:
         for i in range(10):
             await db.connection.execute(
                 """
-                INSERT INTO articles (feed_id, guid, title, published_at)
+                INSERT INTO articles (source_id, guid, title, published_at)
                 VALUES (?, ?, ?, ?)
                 """,
-                (feed.id, f"guid{i}", f"Article {i}", datetime.now()),
+                (feed.source_id, f"guid{i}", f"Article {i}", datetime.now()),
             )
         await db.connection.commit()
 
@@ -167,22 +267,89 @@ class TestArticleOperations:
         assert page2.has_next is False
         assert page2.has_prev is True
 
+    async def test_get_articles_cursor_pages(self, db: Database, user, feed):
+        # Ties on published_at and articles without one exercise every tiebreak
+        same_time = datetime(2024, 1, 1, 12, 0)
+        for i in range(12):
+            await db.connection.execute(
+                "INSERT INTO articles (source_id, guid, title, published_at) VALUES (?, ?, ?, ?)",
+                (feed.source_id, f"guid{i}", f"Article {i}", None if i % 4 == 0 else same_time),
+            )
+        await db.connection.commit()
+
+        expected = [a.id for a in (await get_articles(db, user.id, page=1)).articles]
+        pages = [await get_articles(db, user.id, page=1)]
+        while pages[-1].has_next:
+            pages.append(await get_articles(db, user.id, page=len(pages) + 1, after=pages[-1].next_cursor))
+
+        ids = [a.id for page in pages for a in page.articles]
+        assert len(pages) == 3
+        assert ids[:5] == expected
+        assert len(ids) == len(set(ids)) == 12
+        # Undated articles come last
+        assert all(a.published_at is None for a in pages[-1].articles)
+
+        # Walking back with before lands on the same pages
+        back = await get_articles(db, user.id, page=2, before=pages[2].prev_cursor)
+        assert [a.id for a in back.articles] == [a.id for a in pages[1].articles]
+        assert back.has_prev is True
+        first = await get_articles(db, user.id, page=1, before=back.prev_cursor)
+        assert [a.id for a in first.articles] == expected
+        assert first.has_prev is False
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {},
+            {"hide_read": True, "label": "tech"},
+            {"after": encode_cursor("2024-01-01 00:00:00", "2024-01-01 00:00:00", 5)},
+            {"after": encode_cursor(None, "2024-01-01 00:00:00", 5)},
+            {"before": encode_cursor("2024-01-01 00:00:00", "2024-01-01 00:00:00", 5)},
+        ],
+    )
+    async def test_get_articles_walks_sort_index(self, db: Database, user, feed, options):
+        async with count_queries(db) as statements:
+            await get_articles(db, user.id, **options)
+        list_sql = next(statement for statement in statements if "ORDER BY" in statement)
+
+        cursor = await db.connection.execute(f"EXPLAIN QUERY PLAN {list_sql}")
+        plan = [row["detail"] for row in await cursor.fetchall()]
+        # Articles are read in list order straight from the index, and never sorted
+        assert plan[0].startswith(("SCAN a USING INDEX idx_articles_sort", "SEARCH a USING INDEX idx_articles_sort"))
+        assert not any("TEMP B-TREE" in step for step in plan)
+
+    async def test_get_articles_invalid_cursor_falls_back_to_page(self, db: Database, user, feed):
+        await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid1", "Article 1"),
+        )
+        await db.connection.commit()
+
+        result = await get_articles(db, user.id, after="not-a-cursor")
+        assert len(result.articles) == 1
+
+    def test_decode_cursor_rejects_other_json(self):
+        assert decode_cursor(encode_cursor(None, "2024-01-01 00:00:00", 1)) == (None, "2024-01-01 00:00:00", 1)
+        assert decode_cursor("MTIz") is None  # 123
+        assert decode_cursor("bnVsbA") is None  # null
+        assert decode_cursor("WzEsMl0") is None  # [1,2]
+
     async def test_get_articles_hide_read(self, db: Database, user, feed):
         # Insert articles
         cursor = await db.connection.execute(
             """
-            INSERT INTO articles (feed_id, guid, title)
+            INSERT INTO articles (source_id, guid, title)
             VALUES (?, ?, ?)
             """,
-            (feed.id, "guid1", "Article 1"),
+            (feed.source_id, "guid1", "Article 1"),
         )
         article1_id = cursor.lastrowid
         await db.connection.execute(
             """
-            INSERT INTO articles (feed_id, guid, title)
+            INSERT INTO articles (source_id, guid, title)
             VALUES (?, ?, ?)
             """,
-            (feed.id, "guid2", "Article 2"),
+            (feed.source_id, "guid2", "Article 2"),
         )
         await db.connection.commit()
 
@@ -204,12 +371,12 @@ class TestArticleOperations:
 
         # Add articles to each
         await db.connection.execute(
-            "INSERT INTO articles (feed_id, guid, title) VALUES (?, ?, ?)",
-            (feed1.id, "g1", "Tech Article"),
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed1.source_id, "g1", "Tech Article"),
         )
         await db.connection.execute(
-            "INSERT INTO articles (feed_id, guid, title) VALUES (?, ?, ?)",
-            (feed2.id, "g2", "News Article"),
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed2.source_id, "g2", "News Article"),
         )
         await db.connection.commit()
 
@@ -220,13 +387,13 @@ class TestArticleOperations:
 
     async def test_get_article(self, db: Database, user, feed):
         cursor = await db.connection.execute(
-            """
-            INSERT INTO articles (feed_id, guid, title, content)
-            VALUES (?, ?, ?, ?)
-            """,
-            (feed.id, "guid1", "Test Article", "<p>Content here</p>"),
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid1", "Test Article"),
         )
         article_id = cursor.lastrowid
+        await db.connection.execute(
+            "INSERT INTO article_content (article_id, content) VALUES (?, ?)", (article_id, "<p>Content here</p>")
+        )
         await db.connection.commit()
 
         article = await get_article(db, article_id, user.id)
@@ -234,14 +401,47 @@ class TestArticleOperations:
         assert article.title == "Test Article"
         assert article.content == "<p>Content here</p>"
 
+    async def test_get_article_simplifies_older_content_once(self, db: Database, user, feed):
+        cursor = await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)", (feed.source_id, "guid1", "Article 1")
+        )
+        article_id = cursor.lastrowid
+        await db.connection.execute(
+            "INSERT INTO article_content (article_id, content) VALUES (?, ?)",
+            (article_id, '<p style="x">Body</p><script>x()</script>'),
+        )
+        await db.connection.commit()
+
+        article = await get_article(db, article_id, user.id)
+        assert article.content == "<p>Body</p>"
+        cursor = await db.connection.execute("SELECT content, processed_content FROM article_content")
+        row = await cursor.fetchone()
+        assert row["processed_content"] == "<p>Body</p>"
+        assert row["content"].startswith('<p style="x">')
+
+    async def test_get_article_paged_at_ingest_is_read_only(self, db: Database, user, feed, monkeypatch):
+        monkeypatch.setattr(settings, "article_page_chars", 100)
+        _, entries, _ = feed_service.parse_entries(
+            f"""<rss version="2.0"><channel><title>T</title><item><guid>a</guid>
+            <description>{escape("<p>One</p>" * 30)}</description></item></channel></rss>""",
+            "https://example.com/rss",
+        )
+        async with db.transaction() as conn:
+            await insert_articles(conn, feed.source_id, entries)
+
+        async with count_queries(db) as statements:
+            article = await get_article(db, 1, user.id)
+        assert len(article.page_breaks) == 2
+        assert not any(statement.lstrip().startswith(("BEGIN", "INSERT")) for statement in statements)
+
     async def test_get_article_not_found(self, db: Database, user):
         article = await get_article(db, 9999, user.id)
         assert article is None
 
     async def test_mark_article_read_unread(self, db: Database, user, feed):
         cursor = await db.connection.execute(
-            "INSERT INTO articles (feed_id, guid, title) VALUES (?, ?, ?)",
-            (feed.id, "guid1", "Test"),
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid1", "Test"),
         )
         article_id = cursor.lastrowid
         await db.connection.commit()
@@ -259,3 +459,275 @@ class TestArticleOperations:
         await mark_article_unread(db, user.id, article_id)
         article = await get_article(db, article_id, user.id)
         assert article.is_read is False
+
+
+# Schema as created before migrations were introduced
+BASELINE_SCHEMA = """
+CREATE TABLE users (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+CREATE TABLE feeds (
+    id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, url TEXT NOT NULL, title TEXT, last_fetched TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, FOREIGN KEY (user_id) REFERENCES users(id), UNIQUE(user_id, url)
+);
+CREATE TABLE feed_labels (
+    feed_id INTEGER NOT NULL, label TEXT NOT NULL, PRIMARY KEY (feed_id, label),
+    FOREIGN KEY (feed_id) REFERENCES feeds(id) ON DELETE CASCADE
+);
+CREATE TABLE articles (
+    id INTEGER PRIMARY KEY, feed_id INTEGER NOT NULL, guid TEXT NOT NULL, title TEXT, link TEXT, content TEXT,
+    summary TEXT, published_at TIMESTAMP, fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (feed_id) REFERENCES feeds(id) ON DELETE CASCADE, UNIQUE(feed_id, guid)
+);
+CREATE TABLE read_articles (
+    user_id INTEGER NOT NULL, article_id INTEGER NOT NULL, read_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, article_id), FOREIGN KEY (user_id) REFERENCES users(id),
+    FOREIGN KEY (article_id) REFERENCES articles(id) ON DELETE CASCADE
+);
+"""
+
+
+class TestMigrations:
+    async def test_upgrades_baseline_schema(self, tmp_path):
+        db_path = tmp_path / "old.db"
+        conn = sqlite3.connect(db_path)
+        conn.executescript(BASELINE_SCHEMA)
+        conn.executescript(
+            """
+            INSERT INTO users (id, key) VALUES (1, 'alice'), (2, 'bob');
+            -- Both users follow the same URL, so its articles are merged
+            INSERT INTO feeds (id, user_id, url, title) VALUES
+                (1, 1, 'https://example.com/rss', 'Example'),
+                (2, 2, 'https://example.com/rss', 'Example'),
+                (3, 2, 'https://other.com/rss', 'Other');
+            INSERT INTO feed_labels (feed_id, label) VALUES (2, 'tech');
+            INSERT INTO articles (id, feed_id, guid, title, content) VALUES
+                (1, 1, 'a', 'A', '<p>Body A</p>'), (2, 2, 'a', 'A', '<p>Body A</p>'), (3, 2, 'b', 'B', NULL),
+                (4, 3, 'c', 'C', '<p class="x">Body C<script>track()</script></p>');
+            -- Bob read his copy of 'a', which is folded into article 1
+            INSERT INTO read_articles (user_id, article_id) VALUES (2, 2);
+            """
+        )
+        conn.close()
+
+        database = Database(db_path)
+        await database.connect()
+        try:
+            alice_feeds = await get_user_feeds(database, 1)
+            bob_feeds = await get_user_feeds(database, 2)
+            assert [f.url for f in alice_feeds] == ["https://example.com/rss"]
+            assert [(f.id, f.title, f.labels) for f in bob_feeds] == [(2, "Example", ["tech"]), (3, "Other", [])]
+            assert alice_feeds[0].source_id == bob_feeds[0].source_id
+
+            cursor = await database.connection.execute("SELECT id FROM articles ORDER BY id")
+            assert [row["id"] for row in await cursor.fetchall()] == [1, 3, 4]
+
+            bob_articles = await get_articles(database, 2, hide_read=True)
+            assert {a.title for a in bob_articles.articles} == {"B", "C"}
+            alice_articles = await get_articles(database, 1, hide_read=True)
+            assert {a.title for a in alice_articles.articles} == {"A", "B"}
+
+            # Bodies are moved to their own table
+            cursor = await database.connection.execute("SELECT article_id FROM article_content ORDER BY article_id")
+            assert [row["article_id"] for row in await cursor.fetchall()] == [1, 4]
+            assert (await get_article(database, 4, 2)).content == "<p>Body C</p>"
+            assert (await get_article(database, 3, 2)).content is None
+
+            # And indexed for search by their text alone
+            results = (await search_articles(database, 2, "body c")).articles
+            assert [(a.id, a.summary) for a in results] == [(4, "Body C")]
+            assert (await search_articles(database, 2, "track")).total_count == 0
+            assert (await search_articles(database, 2, "class")).total_count == 0
+
+            # Existing sources are due for a refresh straight away
+            cursor = await database.connection.execute(
+                "SELECT COUNT(*) FROM sources WHERE next_refresh_at IS NULL AND failure_count = 0"
+            )
+            assert (await cursor.fetchone())[0] == 2
+        finally:
+            await database.disconnect()
+
+
+class TestSharedSources:
+    async def test_same_url_shares_source(self, db: Database, user, feed):
+        other = await create_user(db, "other001")
+        other_feed = await create_feed(db, other.id, feed.url)
+        assert other_feed.source_id == feed.source_id
+        assert other_feed.id != feed.id
+
+    async def test_read_state_is_per_user(self, db: Database, user, feed):
+        other = await create_user(db, "other001")
+        other_feed = await create_feed(db, other.id, feed.url)
+        cursor = await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid1", "Shared"),
+        )
+        article_id = cursor.lastrowid
+        await db.connection.commit()
+
+        await mark_article_read(db, user.id, article_id)
+
+        assert (await get_article(db, article_id, user.id)).is_read is True
+        theirs = await get_article(db, article_id, other.id)
+        assert theirs.is_read is False
+        assert theirs.feed_id == other_feed.id
+
+    async def test_article_hidden_from_non_subscribers(self, db: Database, feed):
+        other = await create_user(db, "other001")
+        cursor = await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid1", "Private"),
+        )
+        await db.connection.commit()
+        assert await get_article(db, cursor.lastrowid, other.id) is None
+
+    async def test_delete_keeps_source_with_other_subscribers(self, db: Database, user, feed):
+        other = await create_user(db, "other001")
+        await create_feed(db, other.id, feed.url)
+        await delete_feed(db, feed.id)
+
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM sources WHERE id = ?", (feed.source_id,))
+        assert (await cursor.fetchone())[0] == 1
+
+    async def test_delete_last_subscriber_removes_source(self, db: Database, feed):
+        await delete_feed(db, feed.id)
+
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM sources WHERE id = ?", (feed.source_id,))
+        assert (await cursor.fetchone())[0] == 0
+
+
+async def _all_counts(db: Database, user_id: int) -> dict:
+    """Total count for every label filter and read state, as get_articles reports it."""
+    return {
+        (label, hide_read): (await get_articles(db, user_id, hide_read=hide_read, label=label)).total_count
+        for label in (None, "tech", "news", "other")
+        for hide_read in (False, True)
+    }
+
+
+class TestArticleCounts:
+    async def assert_cache_matches_db(self, db: Database, *user_ids: int) -> None:
+        cached = [await _all_counts(db, user_id) for user_id in user_ids]
+        article_counts.clear()
+        assert cached == [await _all_counts(db, user_id) for user_id in user_ids]
+
+    async def test_counts_are_cached(self, db: Database, user, feed):
+        await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid1", "Article 1"),
+        )
+        await db.connection.commit()
+        assert (await get_articles(db, user.id)).total_count == 1
+
+        # Rows written behind the cache's back don't show up until it is cleared
+        await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?)",
+            (feed.source_id, "guid2", "Article 2"),
+        )
+        await db.connection.commit()
+        assert (await get_articles(db, user.id)).total_count == 1
+
+    async def test_counts_follow_writes(self, db: Database, user, feed, monkeypatch):
+        other = await create_user(db, "other")
+        guids = ["guid1", "guid2", "guid3"]
+
+        async def fake_fetch(url, etag=None, last_modified=None):
+            return ParsedFeed(title="Feed", entries=[make_entry(guid, title=guid) for guid in guids])
+
+        monkeypatch.setattr(feed_service, "fetch_and_parse_feed", fake_fetch)
+        await _all_counts(db, user.id)
+        await _all_counts(db, other.id)
+
+        await feed_service.refresh_feed(db, feed.id)
+        await self.assert_cache_matches_db(db, user.id)
+
+        other_feed = await create_feed(db, other.id, feed.url, ["other"])
+        await self.assert_cache_matches_db(db, user.id, other.id)
+
+        cursor = await db.connection.execute("SELECT id FROM articles ORDER BY id")
+        article_ids = [row["id"] for row in await cursor.fetchall()]
+        await mark_article_read(db, user.id, article_ids[0])
+        await mark_article_read(db, user.id, article_ids[0])
+        await mark_article_read(db, other.id, article_ids[1])
+        await self.assert_cache_matches_db(db, user.id, other.id)
+
+        await mark_article_unread(db, user.id, article_ids[0])
+        await self.assert_cache_matches_db(db, user.id, other.id)
+
+        await set_feed_labels(db, feed.id, ["other", "news"])
+        await self.assert_cache_matches_db(db, user.id, other.id)
+
+        guids.append("guid4")
+        await feed_service.refresh_feed(db, feed.id)
+        await self.assert_cache_matches_db(db, user.id, other.id)
+
+        await db.connection.execute(
+            "UPDATE articles SET fetched_at = ? WHERE id = ?",
+            (datetime(2000, 1, 1), article_ids[1]),
+        )
+        await db.connection.commit()
+        await _all_counts(db, user.id)
+        await _all_counts(db, other.id)
+        assert await feed_service.cleanup_old_articles(db) == 1
+        await self.assert_cache_matches_db(db, user.id, other.id)
+
+        await delete_feed(db, other_feed.id)
+        await self.assert_cache_matches_db(db, user.id, other.id)
+        assert (await get_articles(db, other.id)).total_count == 0
+
+
+class TestSearch:
+    def test_search_query(self):
+        assert search_query("e-ink OR kindle") == '"e" "ink" "OR" "kindle"*'
+        assert search_query(' "*( ') is None
+
+    async def test_ranks_title_matches_first(self, db: Database, user, feed):
+        async with db.transaction() as conn:
+            await insert_articles(
+                conn,
+                feed.source_id,
+                [
+                    make_entry("a", title="Gardening", content="<p>Notes on <b>e-ink</b> screens &amp; more</p>"),
+                    make_entry("b", title="E-ink displays", content="<p>A review</p>"),
+                    make_entry("c", title="Cooking", content="<p>Nothing relevant</p>"),
+                ],
+            )
+
+        results = await search_articles(db, user.id, "E-INK")
+        assert [a.title for a in results.articles] == ["E-ink displays", "Gardening"]
+        assert results.total_count == 2
+        # Excerpts are plain text
+        assert results.articles[1].summary == "Notes on e-ink screens & more"
+        # The last word matches as a prefix
+        assert (await search_articles(db, user.id, "garden")).total_count == 1
+
+    async def test_scoped_to_user_and_paginated(self, db: Database, user, feed, monkeypatch):
+        monkeypatch.setattr(settings, "articles_per_page", 2)
+        other = await create_user(db, "other")
+        other_feed = await create_feed(db, other.id, "https://other.com/rss")
+        async with db.transaction() as conn:
+            await insert_articles(conn, feed.source_id, [make_entry(f"g{i}", title=f"Kindle {i}") for i in range(3)])
+            await insert_articles(conn, other_feed.source_id, [make_entry("x", title="Kindle elsewhere")])
+
+        first = await search_articles(db, user.id, "kindle")
+        assert (first.total_count, first.total_pages, first.has_next) == (3, 2, True)
+        second = await search_articles(db, user.id, "kindle", page=2)
+        assert len(second.articles) == 1
+        assert not second.has_next
+        assert {a.id for a in first.articles}.isdisjoint(a.id for a in second.articles)
+
+    async def test_index_follows_deletes(self, db: Database, user, feed):
+        async with db.transaction() as conn:
+            await insert_articles(
+                conn, feed.source_id, [make_entry("a", title="Old news"), make_entry("b", title="New news")]
+            )
+            # Storing the same entries again doesn't index them twice
+            await insert_articles(conn, feed.source_id, [make_entry("a", title="Old news")])
+        assert (await search_articles(db, user.id, "news")).total_count == 2
+
+        await db.connection.execute("UPDATE articles SET fetched_at = ? WHERE guid = 'a'", (datetime(2000, 1, 1),))
+        await db.connection.commit()
+        await feed_service.cleanup_old_articles(db)
+        assert [a.title for a in (await search_articles(db, user.id, "news")).articles] == ["New news"]
+
+        await delete_feed(db, feed.id)
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM articles_fts")
+        assert (await cursor.fetchone())[0] == 0
@@ -1,12 +1,34 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import httpx
 import pytest
 
+from app.config import settings
+from app.services import feed as feed_service
+from app.services.crud import create_feed, create_user, mark_article_read
 from app.services.feed import (
+    FeedFetchError,
     FeedParseError,
+    ParsedFeed,
+    cleanup_old_articles,
+    fetch_feed_content,
     get_content,
     get_guid,
+    insert_articles,
+    make_entry,
     parse_datetime,
+    parse_entries,
     parse_feed,
+    refresh_all_feeds,
+    refresh_due_sources,
+    refresh_feed,
+    refresh_feeds,
 )
+from app.services.http import HttpClient
+from app.services.polling import backoff_delay, cache_lifetime, declared_interval, observed_interval, retry_after
+from app.services.sanitize import page_breaks, simplify_html, split_pages
+from app.services.workers import ParsePool
 
 SAMPLE_RSS = """<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0">
@@ -68,6 +90,104 @@ class TestParseFeed:
             parse_feed(INVALID_XML)
 
 
+class TestSimplifyHtml:
+    def test_drops_scripts_styles_and_embeds(self):
+        html = (
+            '<p>Keep</p><script>alert(1)</script><style>p{}</style><iframe src="x"><p>gone</p></iframe><embed src="y">'
+        )
+        assert simplify_html(html) == "<p>Keep</p>"
+
+    def test_strips_attributes_and_unwraps_layout(self):
+        html = '<div class="x" style="color:red"><p onclick="x()" style="a">Hi <span>there</span></p></div>'
+        assert simplify_html(html) == "<p>Hi there</p>"
+
+    def test_block_containers_become_paragraphs(self):
+        html = "<div>First paragraph.</div><div>Second <div>nested</div></div><section>Third</section>"
+        assert simplify_html(html) == "<p>First paragraph.</p><p>Second </p><p>nested</p><p>Third</p>"
+
+    def test_table_rows_become_paragraphs(self):
+        html = "<table><tr><th>Name</th><th>Value</th></tr><tr><td><b>A</b></td><td>1</td></tr></table>"
+        assert simplify_html(html) == "<p>Name Value</p><p><b>A</b> 1</p>"
+
+    def test_rewrites_links_and_images(self):
+        html = (
+            '<a href="/post">rel</a><a href="javascript:alert(1)">js</a>'
+            '<img src="/a.png" srcset="/a-2x.png 2x" alt="A" width="800">'
+        )
+        assert simplify_html(html, "https://example.com/blog/1") == (
+            '<a href="https://example.com/post">rel</a><a>js</a><img src="https://example.com/a.png" alt="A">'
+        )
+
+    def test_drops_tracking_pixels(self):
+        html = '<p>Text</p><img src="https://example.com/p.gif" width="1" height="1"><img src="https://pixel.wp.com/g.gif">'
+        assert simplify_html(html) == "<p>Text</p>"
+
+    def test_output_is_well_nested(self):
+        assert simplify_html("<h1>Title</h1><p>One<p>Two <b>bold<ul><li>a<li>b</ul>") == (
+            "<h2>Title</h2><p>One</p><p>Two <b>bold</b></p><ul><li>a</li><li>b</li></ul>"
+        )
+
+    def test_escapes_text(self):
+        assert simplify_html("<p>1 &lt; 2 &amp; <b>x</b></p>") == "<p>1 &lt; 2 &amp; <b>x</b></p>"
+
+
+class TestPageBreaks:
+    def test_short_content_is_one_page(self):
+        assert page_breaks("<p>Short</p>", 100) == []
+        assert page_breaks(None, 100) == []
+
+    def test_splits_between_top_level_blocks(self):
+        html = "".join(f"<p>{i} {'x' * 40}</p>" for i in range(10))
+        pages = split_pages(html, page_breaks(html, 120))
+        assert "".join(pages) == html
+        assert len(pages) == 5
+        assert all(page.startswith("<p>") and page.endswith("</p>") for page in pages)
+
+    def test_never_splits_inside_a_block_or_after_a_heading(self):
+        html = "<h2>Title</h2><ul>" + "<li>item</li>" * 20 + "</ul><p>" + "x" * 100 + "</p>"
+        assert split_pages(html, page_breaks(html, 120)) == [
+            "<h2>Title</h2><ul>" + "<li>item</li>" * 20 + "</ul>",
+            "<p>" + "x" * 100 + "</p>",
+        ]
+
+    def test_splits_div_based_content(self):
+        html = simplify_html("".join(f"<div>Paragraph {i} {'x' * 500}</div>" for i in range(40)))
+        pages = split_pages(html, page_breaks(html, 3000))
+        assert len(pages) == 8
+        assert all(page.startswith("<p>Paragraph") and page.endswith("</p>") for page in pages)
+
+    def test_short_tail_stays_on_last_page(self):
+        html = "<p>" + "x" * 200 + "</p><p>end</p>"
+        assert page_breaks(html, 150) == []
+
+
+class TestParseEntries:
+    def test_normalizes_entries(self):
+        title, entries, declared = parse_entries(SAMPLE_RSS, "https://example.com/rss")
+        assert title == "Test Feed"
+        assert declared is None
+        assert [e["guid"] for e in entries] == ["article-1", "article-2"]
+        assert entries[0]["published_at"].year == 2024
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    async def test_runs_in_parse_pool(self, executor, monkeypatch):
+        monkeypatch.setattr(settings, "parse_executor", executor)
+        pool = ParsePool()
+        pool.start()
+        try:
+            title, entries, _ = await pool.run(parse_entries, SAMPLE_ATOM, "https://example.com/atom")
+        finally:
+            pool.shutdown()
+
+        assert title == "Test Atom Feed"
+        assert entries[0]["content"] == "<p>Full content</p>"
+        assert entries[0]["processed_content"] == "<p>Full content</p>"
+
+    async def test_parse_errors_propagate(self):
+        with pytest.raises(FeedParseError):
+            await ParsePool().run(parse_entries, INVALID_XML, "https://example.com/bad")
+
+
 class TestGetGuid:
     def test_uses_id(self):
         entry = {"id": "unique-id", "link": "https://example.com", "title": "Title"}
@@ -133,3 +253,406 @@ class TestParseDatetime:
     def test_returns_none_when_missing(self):
         entry = {}
         assert parse_datetime(entry) is None
+
+
+class TestRefreshFeeds:
+    async def test_refreshes_all_feeds_concurrently(self, db, user, monkeypatch):
+        feeds = [await create_feed(db, user.id, f"https://host{i}.example.com/rss") for i in range(4)]
+        in_flight = 0
+        peak = 0
+
+        async def fake_fetch(url, etag=None, last_modified=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return ParsedFeed(title="Feed", entries=[make_entry(url, title="A", link=url)])
+
+        monkeypatch.setattr(feed_service, "fetch_and_parse_feed", fake_fetch)
+        results = await feed_service.refresh_all_feeds(db, user.id)
+
+        assert results == {f.id: 1 for f in feeds}
+        assert peak == 4
+
+    async def test_limits_per_host_concurrency(self, db, user, monkeypatch):
+        feeds = [await create_feed(db, user.id, f"https://same.example.com/{i}.xml") for i in range(6)]
+        in_flight = 0
+        peak = 0
+
+        async def fake_fetch(url, etag=None, last_modified=None):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return ParsedFeed(title="Feed")
+
+        monkeypatch.setattr(feed_service, "fetch_and_parse_feed", fake_fetch)
+        monkeypatch.setattr(feed_service.settings, "refresh_per_host_concurrency", 2)
+        results = await feed_service.refresh_feeds(db, [f.id for f in feeds])
+
+        assert set(results) == {f.id for f in feeds}
+        assert peak == 2
+
+    async def test_reports_errors_per_feed(self, db, user, monkeypatch):
+        ok = await create_feed(db, user.id, "https://ok.example.com/rss")
+        bad = await create_feed(db, user.id, "https://bad.example.com/rss")
+
+        async def fake_fetch(url, etag=None, last_modified=None):
+            if "bad" in url:
+                raise FeedFetchError("HTTP error 500")
+            return ParsedFeed(title="Feed")
+
+        monkeypatch.setattr(feed_service, "fetch_and_parse_feed", fake_fetch)
+        results = await feed_service.refresh_feeds(db, [ok.id, bad.id])
+
+        assert results[ok.id] == 0
+        assert results[bad.id] == "HTTP error 500"
+
+
+class TestFetchFeedContent:
+    async def test_fetches_with_shared_client(self, httpx_mock, monkeypatch):
+        httpx_mock.add_response(url="https://example.com/feed.xml", text=SAMPLE_RSS)
+        client = HttpClient()
+        await client.start()
+        monkeypatch.setattr(feed_service, "http_client", client)
+        try:
+            fetched = await feed_service.fetch_feed_content("https://example.com/feed.xml")
+        finally:
+            await client.close()
+
+        assert "Test Feed" in fetched.content
+
+    async def test_fetches_without_shared_client(self, httpx_mock):
+        httpx_mock.add_response(url="https://example.com/feed.xml", text=SAMPLE_RSS)
+        fetched = await fetch_feed_content("https://example.com/feed.xml")
+        assert "Test Feed" in fetched.content
+
+    async def test_http_error_raises(self, httpx_mock):
+        httpx_mock.add_response(url="https://example.com/feed.xml", status_code=500)
+        with pytest.raises(FeedFetchError):
+            await fetch_feed_content("https://example.com/feed.xml")
+
+
+class TestConditionalRefresh:
+    async def test_sends_validators(self, httpx_mock):
+        httpx_mock.add_response(
+            url="https://example.com/feed.xml",
+            match_headers={"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 12:00:00 GMT"},
+            status_code=304,
+        )
+        fetched = await fetch_feed_content("https://example.com/feed.xml", '"v1"', "Mon, 01 Jan 2024 12:00:00 GMT")
+        assert fetched.not_modified
+        assert fetched.etag == '"v1"'
+
+    async def test_not_modified_skips_inserts(self, db, feed, httpx_mock):
+        httpx_mock.add_response(
+            url=feed.url,
+            text=SAMPLE_RSS,
+            headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 12:00:00 GMT"},
+        )
+        first = await refresh_feeds(db, [feed.id])
+        assert first == {feed.id: 2}
+        assert first.not_modified == set()
+
+        cursor = await db.connection.execute(
+            "SELECT etag, last_modified FROM sources WHERE id = ?",
+            (feed.source_id,),
+        )
+        row = await cursor.fetchone()
+        assert row["etag"] == '"v1"'
+        assert row["last_modified"] == "Mon, 01 Jan 2024 12:00:00 GMT"
+
+        httpx_mock.add_response(url=feed.url, match_headers={"If-None-Match": '"v1"'}, status_code=304)
+        second = await refresh_feeds(db, [feed.id])
+        assert second == {feed.id: 0}
+        assert second.not_modified == {feed.id}
+
+
+class TestSharedSourceRefresh:
+    async def test_fetches_shared_url_once(self, db, user, feed, httpx_mock):
+        other = await create_user(db, "other001")
+        other_feed = await create_feed(db, other.id, feed.url)
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS)
+
+        results = await refresh_feeds(db, [feed.id, other_feed.id])
+
+        assert results == {feed.id: 2, other_feed.id: 2}
+        assert len(httpx_mock.get_requests()) == 1
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM articles")
+        assert (await cursor.fetchone())[0] == 2
+
+
+class TestPollingSchedule:
+    async def insert_recent(self, db, feed, count: int, prefix: str) -> None:
+        await db.connection.executemany(
+            "INSERT INTO articles (source_id, guid, title, published_at) VALUES (?, ?, 'Recent', ?)",
+            [(feed.source_id, f"{prefix}{i}", datetime.now() - timedelta(minutes=i)) for i in range(count)],
+        )
+        await db.connection.commit()
+
+    async def test_interval_follows_publishing_rate(self, db, feed):
+        now = datetime.now()
+        assert await observed_interval(db.connection, feed.source_id, now) == settings.refresh_interval_seconds
+
+        # Only old articles: the feed has gone quiet
+        await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title, published_at) VALUES (?, 'old', 'Old', '2000-01-01')",
+            (feed.source_id,),
+        )
+        await db.connection.commit()
+        assert await observed_interval(db.connection, feed.source_id, now) == settings.refresh_max_interval_seconds
+
+        # 28 articles a week is one every 6 hours
+        await self.insert_recent(db, feed, 28, "daily")
+        assert await observed_interval(db.connection, feed.source_id, now) == 6 * 3600
+
+        # A busy feed is still polled no more often than the minimum
+        await self.insert_recent(db, feed, 1000, "busy")
+        assert await observed_interval(db.connection, feed.source_id, now) == settings.refresh_min_interval_seconds
+
+    async def test_refresh_schedules_next_poll(self, db, feed, httpx_mock):
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS)
+        before = datetime.now()
+        await refresh_feeds(db, [feed.id])
+
+        cursor = await db.connection.execute(
+            "SELECT refresh_interval, next_refresh_at FROM sources WHERE id = ?", (feed.source_id,)
+        )
+        row = await cursor.fetchone()
+        # The sample articles are from 2024, so the feed looks quiet
+        assert row["refresh_interval"] == settings.refresh_max_interval_seconds
+        assert datetime.fromisoformat(row["next_refresh_at"]) >= before + timedelta(days=1)
+
+    async def test_errors_back_off(self, db, feed, httpx_mock):
+        async def status():
+            cursor = await db.connection.execute(
+                "SELECT failure_count, last_error, backoff_until, next_refresh_at FROM sources WHERE id = ?",
+                (feed.source_id,),
+            )
+            return await cursor.fetchone()
+
+        httpx_mock.add_response(url=feed.url, status_code=500)
+        httpx_mock.add_response(url=feed.url, status_code=500)
+        delays = []
+        for _ in range(2):
+            before = datetime.now()
+            with pytest.raises(FeedFetchError):
+                await refresh_feed(db, feed.id)
+            delays.append((datetime.fromisoformat((await status())["backoff_until"]) - before).total_seconds())
+
+        row = await status()
+        assert row["failure_count"] == 2
+        assert "500" in row["last_error"]
+        assert row["next_refresh_at"] == row["backoff_until"]
+        # The delay doubles with each failure
+        assert delays[0] == pytest.approx(settings.refresh_min_interval_seconds, abs=5)
+        assert delays[1] == pytest.approx(settings.refresh_min_interval_seconds * 2, abs=5)
+
+        # A success clears the failure state
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS)
+        await refresh_feed(db, feed.id)
+        row = await status()
+        assert (row["failure_count"], row["last_error"], row["backoff_until"]) == (0, None, None)
+
+    async def test_unexpected_errors_back_off(self, db, feed, httpx_mock):
+        httpx_mock.add_exception(httpx.InvalidURL("Invalid port"), url=feed.url)
+        with pytest.raises(httpx.InvalidURL):
+            await refresh_feed(db, feed.id)
+
+        cursor = await db.connection.execute(
+            "SELECT failure_count, last_error, next_refresh_at FROM sources WHERE id = ?", (feed.source_id,)
+        )
+        row = await cursor.fetchone()
+        assert (row["failure_count"], row["last_error"]) == (1, "Invalid port")
+        assert datetime.fromisoformat(row["next_refresh_at"]) > datetime.now()
+
+    def test_backoff_delay_is_capped(self):
+        assert backoff_delay(1) == settings.refresh_min_interval_seconds
+        assert backoff_delay(100) == settings.refresh_backoff_max_seconds
+
+    async def test_refresh_all_skips_backing_off_feeds(self, db, user, feed, httpx_mock):
+        failing = await create_feed(db, user.id, "https://dead.example.org/feed.xml")
+        await db.connection.execute(
+            "UPDATE sources SET failure_count = 4, backoff_until = ? WHERE id = ?",
+            (datetime.now() + timedelta(hours=1), failing.source_id),
+        )
+        await db.connection.commit()
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS)
+
+        results = await refresh_all_feeds(db, user.id)
+
+        assert results == {feed.id: 2}
+        assert len(httpx_mock.get_requests()) == 1
+
+    def test_declared_interval(self):
+        assert declared_interval({}) is None
+        assert declared_interval({"ttl": "60"}) == 3600
+        assert declared_interval({"sy_updateperiod": "daily", "sy_updatefrequency": "2"}) == 43200
+        # The shorter of the two wins; nonsense is ignored
+        assert declared_interval({"ttl": "120", "sy_updateperiod": "hourly"}) == 3600
+        assert declared_interval({"ttl": "soon", "sy_updateperiod": "fortnightly"}) is None
+
+    def test_cache_lifetime(self):
+        assert cache_lifetime(httpx.Headers({"Cache-Control": "public, max-age=1800"})) == 1800
+        assert cache_lifetime(httpx.Headers({"Cache-Control": "no-cache, max-age=1800"})) is None
+        expires = {"Date": "Mon, 01 Jan 2024 12:00:00 GMT", "Expires": "Mon, 01 Jan 2024 14:00:00 GMT"}
+        assert cache_lifetime(httpx.Headers(expires)) == 7200
+        assert cache_lifetime(httpx.Headers({"Expires": "0"})) is None
+        assert cache_lifetime(httpx.Headers()) is None
+
+    def test_retry_after(self):
+        assert retry_after("120") == 120
+        assert retry_after(None) is None
+        assert retry_after("Mon, 01 Jan 2024 12:00:00 GMT") is None  # Already passed
+        later = (datetime.now(UTC) + timedelta(hours=2)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+        assert retry_after(later) == pytest.approx(7200, abs=5)
+
+    async def test_hints_stretch_interval(self, db, feed, httpx_mock):
+        async def interval():
+            cursor = await db.connection.execute("SELECT refresh_interval FROM sources WHERE id = ?", (feed.source_id,))
+            return (await cursor.fetchone())["refresh_interval"]
+
+        # Publishes every 6 hours, but asks to be polled at most every 12
+        await self.insert_recent(db, feed, 28, "daily")
+        ttl_rss = SAMPLE_RSS.replace("<channel>", "<channel><ttl>720</ttl>")
+        httpx_mock.add_response(url=feed.url, text=ttl_rss, headers={"ETag": '"v1"'})
+        await refresh_feed(db, feed.id)
+        assert await interval() == 12 * 3600
+
+        # The declared interval still applies when the feed is unchanged, and so do cache headers
+        httpx_mock.add_response(url=feed.url, status_code=304, headers={"Cache-Control": "max-age=57600"})
+        await refresh_feed(db, feed.id)
+        assert await interval() == 16 * 3600
+        httpx_mock.add_response(url=feed.url, status_code=304)
+        await refresh_feed(db, feed.id)
+        assert await interval() == 12 * 3600
+
+    async def test_honors_retry_after(self, db, feed, httpx_mock):
+        httpx_mock.add_response(url=feed.url, status_code=429, headers={"Retry-After": "7200"})
+        before = datetime.now()
+        with pytest.raises(FeedFetchError):
+            await refresh_feed(db, feed.id)
+
+        cursor = await db.connection.execute("SELECT backoff_until FROM sources WHERE id = ?", (feed.source_id,))
+        backoff_until = datetime.fromisoformat((await cursor.fetchone())["backoff_until"])
+        assert (backoff_until - before).total_seconds() == pytest.approx(7200, abs=5)
+
+    async def test_refreshes_only_due_sources(self, db, user, feed, httpx_mock):
+        later = await create_feed(db, user.id, "https://example.org/feed.xml")
+        await db.connection.execute(
+            "UPDATE sources SET next_refresh_at = ? WHERE id = ?",
+            (datetime.now() + timedelta(hours=1), later.source_id),
+        )
+        await db.connection.commit()
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS)
+
+        results = await refresh_due_sources(db)
+
+        assert results == {feed.source_id: 2}
+        assert len(httpx_mock.get_requests()) == 1
+
+
+class TestInsertArticles:
+    async def test_counts_only_new_entries(self, db, feed):
+        def entry(guid):
+            return make_entry(guid, title=guid)
+
+        async with db.transaction() as conn:
+            assert await insert_articles(conn, feed.source_id, [entry("a"), entry("b")]) == 2
+        async with db.transaction() as conn:
+            assert await insert_articles(conn, feed.source_id, [entry("a"), entry("b"), entry("c"), entry("c")]) == 1
+        async with db.transaction() as conn:
+            assert await insert_articles(conn, feed.source_id, []) == 0
+
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM articles")
+        assert (await cursor.fetchone())[0] == 3
+
+        # Feeds longer than one INSERT are stored in several
+        async with db.transaction() as conn:
+            assert await insert_articles(conn, feed.source_id, [entry(f"many{i}") for i in range(250)]) == 250
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM articles_fts")
+        assert (await cursor.fetchone())[0] == 253
+
+    async def test_stores_bodies_separately(self, db, feed):
+        def entry(guid, content):
+            return make_entry(guid, title=guid, content=content)
+
+        async with db.transaction() as conn:
+            await insert_articles(conn, feed.source_id, [entry("a", "<div>first</div>"), entry("b", None)])
+        async with db.transaction() as conn:
+            await insert_articles(conn, feed.source_id, [entry("a", "<div>changed</div>")])
+
+        cursor = await db.connection.execute(
+            "SELECT a.guid, c.content, c.processed_content FROM article_content c JOIN articles a ON a.id = c.article_id"
+        )
+        assert [tuple(row) for row in await cursor.fetchall()] == [("a", "<div>first</div>", "<p>first</p>")]
+
+
+class TestKnownGuids:
+    async def test_unchanged_entries_skip_insert(self, db, feed, httpx_mock, monkeypatch):
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS, is_reusable=True)
+        assert await feed_service.refresh_feed(db, feed.id) == 2
+
+        inserted = []
+
+        async def spy_insert(conn, source_id, entries):
+            inserted.extend(entries)
+            return len(entries)
+
+        monkeypatch.setattr(feed_service, "insert_articles", spy_insert)
+        assert await feed_service.refresh_feed(db, feed.id) == 0
+        assert inserted == []
+
+    async def test_cleanup_keeps_filter_correct(self, db, feed, httpx_mock):
+        httpx_mock.add_response(url=feed.url, text=SAMPLE_RSS, is_reusable=True)
+        assert await refresh_feed(db, feed.id) == 2
+
+        await db.connection.execute("UPDATE articles SET fetched_at = '2000-01-01 00:00:00'")
+        await db.connection.commit()
+        assert await cleanup_old_articles(db) == 2
+
+        # Entries still in the feed are stored again after their rows were cleaned up
+        assert await refresh_feed(db, feed.id) == 2
+
+
+class TestCleanup:
+    async def insert_old(self, db, feed, count: int, content: str | None = None) -> None:
+        entries = [make_entry(f"old{i}", title=f"Old {i}", content=content) for i in range(count)]
+        async with db.transaction() as conn:
+            await insert_articles(conn, feed.source_id, entries)
+            await conn.execute("UPDATE articles SET fetched_at = '2000-01-01 00:00:00'")
+
+    async def test_deletes_in_batches(self, db, user, feed, monkeypatch, caplog):
+        monkeypatch.setattr(settings, "cleanup_batch_size", 2)
+        monkeypatch.setattr(settings, "cleanup_pause_seconds", 0)
+        await self.insert_old(db, feed, 5)
+        await db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, 'new', 'New')", (feed.source_id,)
+        )
+        await db.connection.commit()
+        await mark_article_read(db, user.id, 1)
+
+        with caplog.at_level("INFO", logger="app.services.feed"):
+            assert await cleanup_old_articles(db) == 5
+        assert sum(message.startswith("Cleanup: deleted") for message in caplog.messages) == 3
+        assert any(message.startswith("Cleanup complete: 5 articles in 3 batches") for message in caplog.messages)
+
+        cursor = await db.connection.execute("SELECT guid FROM articles")
+        assert [row["guid"] for row in await cursor.fetchall()] == ["new"]
+        cursor = await db.connection.execute("SELECT COUNT(*) FROM read_articles")
+        assert (await cursor.fetchone())[0] == 0
+
+    async def test_reclaims_free_pages(self, db, feed, monkeypatch):
+        monkeypatch.setattr(settings, "cleanup_pause_seconds", 0)
+        monkeypatch.setattr(settings, "cleanup_vacuum_pages", 10)
+        await self.insert_old(db, feed, 50, "<p>" + "x" * 5000 + "</p>")
+        cursor = await db.connection.execute("PRAGMA page_count")
+        pages_before = (await cursor.fetchone())[0]
+
+        assert await cleanup_old_articles(db) == 50
+        cursor = await db.connection.execute("PRAGMA freelist_count")
+        assert (await cursor.fetchone())[0] == 0
+        cursor = await db.connection.execute("PRAGMA page_count")
+        assert (await cursor.fetchone())[0] < pages_before
@@ -1,12 +1,21 @@
+import hashlib
+import re
 import tempfile
+from io import BytesIO
 from pathlib import Path
 
 import pytest
 from httpx import ASGITransport, AsyncClient
+from PIL import Image
 
+from app.config import settings
 from app.database import Database, db
 from app.main import app
+from app.services.assets import AssetStore, choose_encoding, minify_css
 from app.services.crud import create_user
+from app.services.feed import FeedFetchError, insert_articles, make_entry, refresh_feed
+from app.services.images import ImageProxy, convert_image, images
+from app.services.page_cache import PageCache
 
 
 @pytest.fixture
@@ -50,6 +59,32 @@ async def user_key(test_db):
     return user.key
 
 
+async def add_articles(test_db: Database, count: int) -> list[int]:
+    """Subscribe the first user to a feed with ``count`` articles and return their ids."""
+    cursor = await test_db.connection.execute(
+        "INSERT INTO sources (url, title) VALUES (?, ?) RETURNING id", ("https://example.com/feed.xml", "Feed")
+    )
+    source_id = (await cursor.fetchone())[0]
+    await test_db.connection.execute("INSERT INTO feeds (user_id, source_id) VALUES (1, ?)", (source_id,))
+    ids = []
+    for i in range(count):
+        cursor = await test_db.connection.execute(
+            "INSERT INTO articles (source_id, guid, title) VALUES (?, ?, ?) RETURNING id",
+            (source_id, f"guid{i}", f"Article {i}"),
+        )
+        ids.append((await cursor.fetchone())[0])
+    await test_db.connection.commit()
+    return ids
+
+
+async def set_content(test_db: Database, content: str) -> None:
+    """Give every article the same body."""
+    await test_db.connection.execute(
+        "INSERT INTO article_content (article_id, content) SELECT id, ? FROM articles", (content,)
+    )
+    await test_db.connection.commit()
+
+
 class TestHealthCheck:
     async def test_status_endpoint(self, client: AsyncClient):
         response = await client.get("/api/status")
@@ -131,6 +166,21 @@ class TestFeedsPage:
         assert b"Add Feed" in response.content
         assert b'name="url"' in response.content
 
+    async def test_feed_detail_shows_failures(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 0)
+        cookies = {"user_key": user_key}
+        response = await client.get("/feeds/1", cookies=cookies)
+        assert "Refresh Status" not in response.text
+
+        await test_db.connection.execute(
+            "UPDATE sources SET failure_count = 3, last_error = 'Connection timed out', "
+            "backoff_until = '2030-01-02 03:04:00'"
+        )
+        await test_db.connection.commit()
+        response = await client.get("/feeds/1", cookies=cookies)
+        assert "Failed 3 times in a row: Connection timed out" in response.text
+        assert "Next automatic retry: 2030-01-02 03:04" in response.text
+
 
 class TestArticlePage:
     async def test_article_not_found(self, client: AsyncClient, user_key: str):
@@ -157,3 +207,325 @@ class TestPagination:
             cookies={"user_key": user_key},
         )
         assert response.status_code == 200
+
+    async def test_next_link_carries_cursor(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 7)
+
+        response = await client.get("/", cookies={"user_key": user_key})
+        match = re.search(r'href="/\?page=2&after=([\w-]+)"', response.text)
+        assert match
+
+        response = await client.get(f"/?page=2&after={match.group(1)}", cookies={"user_key": user_key})
+        assert response.status_code == 200
+        assert response.text.count('class="article-card') == 2
+        assert 'href="/?page=1"' in response.text
+
+    async def test_malformed_cursor_shows_page(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 1)
+        for query in ("after=MTIz", "before=bnVsbA"):
+            response = await client.get(f"/?page=2&{query}", cookies={"user_key": user_key})
+            assert response.status_code == 200
+
+    async def test_home_page_is_cached(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 2)
+        first = await client.get("/", cookies={"user_key": user_key})
+        second = await client.get("/", cookies={"user_key": user_key})
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.text == first.text
+
+        other_page = await client.get("/?show_read=true", cookies={"user_key": user_key})
+        assert other_page.headers["X-Cache"] == "MISS"
+
+        stats = (await client.get("/api/cache/stats")).json()["page_cache"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["entries"] == 2
+
+    async def test_reading_an_article_invalidates(self, client: AsyncClient, test_db: Database, user_key: str):
+        article_ids = await add_articles(test_db, 2)
+        await client.get("/", cookies={"user_key": user_key})
+        await client.post(f"/article/{article_ids[0]}/read", cookies={"user_key": user_key})
+
+        response = await client.get("/", cookies={"user_key": user_key})
+        assert response.headers["X-Cache"] == "MISS"
+        assert response.text.count('class="article-card') == 1
+
+    def test_evicts_to_stay_within_budget(self):
+        cache = PageCache(max_bytes=10, ttl_seconds=60)
+        cache.put(1, "a", b"12345", 0)
+        cache.put(1, "b", b"12345", 0)
+        cache.get(1, "a")
+        cache.put(1, "c", b"12345", 0)
+        assert cache.get(1, "a") == b"12345"
+        assert cache.get(1, "b") is None
+        assert cache.stats()["size_bytes"] == 10
+
+    def test_skips_pages_rendered_before_invalidation(self):
+        cache = PageCache(max_bytes=100, ttl_seconds=60)
+        generation = cache.generation(1)
+        cache.invalidate([1])
+        cache.put(1, "a", b"stale", generation)
+        assert cache.get(1, "a") is None
+
+
+class TestConditionalRequests:
+    @pytest.fixture(autouse=True)
+    def fixed_window(self, monkeypatch):
+        # Keep every request in one validator time window
+        monkeypatch.setattr(settings, "page_cache_ttl_seconds", 10**9)
+
+    async def test_home_answers_304_when_unchanged(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 2)
+        response = await client.get("/", cookies={"user_key": user_key})
+        etag = response.headers["ETag"]
+        assert response.headers["Cache-Control"] == "private, no-cache"
+
+        response = await client.get("/", cookies={"user_key": user_key}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+
+        # A different page of the list has its own validator
+        response = await client.get("/?show_read=true", cookies={"user_key": user_key}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+
+    async def test_etag_changes_when_user_data_changes(self, client: AsyncClient, test_db: Database, user_key: str):
+        article_ids = await add_articles(test_db, 2)
+        etag = (await client.get("/", cookies={"user_key": user_key})).headers["ETag"]
+        await client.post(f"/article/{article_ids[0]}/read", cookies={"user_key": user_key})
+
+        response = await client.get("/", cookies={"user_key": user_key}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    async def test_article_revalidates_after_marking_read(self, client: AsyncClient, test_db: Database, user_key: str):
+        article_ids = await add_articles(test_db, 1)
+        url = f"/article/{article_ids[0]}"
+        etag = (await client.get(url, cookies={"user_key": user_key})).headers["ETag"]
+
+        response = await client.get(url, cookies={"user_key": user_key}, headers={"If-None-Match": etag})
+        assert response.status_code == 304
+
+    async def test_feed_page_revalidates_after_refresh_status_changes(
+        self, client: AsyncClient, test_db: Database, user_key: str, httpx_mock
+    ):
+        await add_articles(test_db, 0)
+        etag = (await client.get("/feeds/1", cookies={"user_key": user_key})).headers["ETag"]
+
+        httpx_mock.add_response(url="https://example.com/feed.xml", status_code=500)
+        with pytest.raises(FeedFetchError):
+            await refresh_feed(test_db, 1)
+        response = await client.get("/feeds/1", cookies={"user_key": user_key}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert "Failed 1 time in a row" in response.text
+
+        # A refresh that adds nothing still clears the failure shown on the page
+        etag = response.headers["ETag"]
+        httpx_mock.add_response(url="https://example.com/feed.xml", text="<rss><channel></channel></rss>")
+        await refresh_feed(test_db, 1)
+        response = await client.get("/feeds/1", cookies={"user_key": user_key}, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert "Failed" not in response.text
+
+
+class TestStaticAssets:
+    async def test_pages_link_fingerprinted_stylesheet(self, client: AsyncClient):
+        response = await client.get("/settings")
+        match = re.search(r'href="(/static/style\.[0-9a-f]{10}\.css)"', response.text)
+        assert match
+
+        response = await client.get(match.group(1), headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert response.headers["Content-Type"].startswith("text/css")
+        assert response.text == minify_css(Path("static/style.css").read_text())
+
+    async def test_plain_name_is_revalidated(self, client: AsyncClient):
+        response = await client.get("/static/style.css", headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+        assert response.headers["Cache-Control"] == "public, no-cache"
+
+        headers = {"Accept-Encoding": "identity", "If-None-Match": f'W/"other", {response.headers["ETag"]}'}
+        response = await client.get("/static/style.css", headers=headers)
+        assert response.status_code == 304
+
+    async def test_etag_differs_per_coding(self, client: AsyncClient):
+        plain = await client.get("/static/style.css", headers={"Accept-Encoding": "identity"})
+        gzipped = await client.get("/static/style.css", headers={"Accept-Encoding": "gzip"})
+        assert plain.headers["ETag"] != gzipped.headers["ETag"]
+
+        # A cached identity body doesn't validate a gzip response
+        headers = {"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]}
+        response = await client.get("/static/style.css", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+
+    async def test_head_request(self, client: AsyncClient):
+        response = await client.head("/static/style.css")
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("text/css")
+        assert response.headers["ETag"]
+
+    async def test_unknown_file(self, client: AsyncClient):
+        response = await client.get("/static/../app/config.py")
+        assert response.status_code == 404
+
+    def test_fingerprint_follows_content(self, tmp_path):
+        (tmp_path / "app.css").write_text("a { color: red; }")
+        store = AssetStore(tmp_path)
+        url = store.url("app.css")
+        (tmp_path / "app.css").write_text("a { color: blue; }")
+        store.load()
+        assert store.url("app.css") != url
+        assert store.get("app.css")[0].content == b"a{color:blue}"
+
+    def test_choose_encoding(self):
+        variants = {"gzip": b"", "br": b""}
+        assert choose_encoding("gzip, deflate, br", variants) == "br"
+        assert choose_encoding("gzip, br;q=0", variants) == "gzip"
+        assert choose_encoding("identity", variants) is None
+        assert choose_encoding("br", {"gzip": b""}) is None
+
+
+class TestCompression:
+    async def test_large_pages_are_gzipped(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 1)
+        await set_content(test_db, "<p>Lorem ipsum dolor.</p>" * 400)
+
+        response = await client.get("/article/1", cookies={"user_key": user_key}, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.num_bytes_downloaded < len(response.content)
+
+    async def test_small_responses_are_not_compressed(self, client: AsyncClient):
+        response = await client.get("/api/status", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers
+
+
+class TestArticlePagination:
+    async def test_long_article_is_split_into_parts(
+        self, client: AsyncClient, test_db: Database, user_key: str, monkeypatch
+    ):
+        monkeypatch.setattr(settings, "article_page_chars", 200)
+        await add_articles(test_db, 1)
+        content = "".join(f"<p>Paragraph {i} {'x' * 60}</p>" for i in range(6))
+        await set_content(test_db, content)
+        cookies = {"user_key": user_key}
+
+        response = await client.get("/article/1?label=tech", cookies=cookies)
+        assert "Paragraph 0" in response.text
+        assert "Paragraph 2" not in response.text
+        assert "1 / 3" in response.text
+        assert 'href="/article/1?label=tech&amp;part=2"' in response.text
+
+        response = await client.get("/article/1?label=tech&part=3", cookies=cookies)
+        assert "Paragraph 5" in response.text
+        assert "Paragraph 0" not in response.text
+        assert 'href="/article/1?label=tech&amp;part=2"' in response.text
+
+        # Out of range parts show the last one
+        response = await client.get("/article/1?part=9", cookies=cookies)
+        assert "3 / 3" in response.text
+
+    async def test_repaginates_when_page_size_changes(
+        self, client: AsyncClient, test_db: Database, user_key: str, monkeypatch
+    ):
+        await add_articles(test_db, 1)
+        await set_content(test_db, "<p>One</p>" * 30)
+
+        response = await client.get("/article/1", cookies={"user_key": user_key})
+        assert "pagination" not in response.text
+
+        monkeypatch.setattr(settings, "article_page_chars", 100)
+        response = await client.get("/article/1", cookies={"user_key": user_key})
+        assert "1 / 3" in response.text
+
+
+class TestSearch:
+    async def test_search_page(self, client: AsyncClient, test_db: Database, user_key: str):
+        await add_articles(test_db, 0)
+        entry = make_entry("a", title="Reading on e-ink", content="<p>Why paper-like screens are easy on the eyes</p>")
+        async with test_db.transaction() as conn:
+            await insert_articles(conn, 1, [entry])
+        cookies = {"user_key": user_key}
+
+        response = await client.get("/search", cookies=cookies)
+        assert response.status_code == 200
+        assert 'name="q"' in response.text
+        assert "article-card" not in response.text
+
+        response = await client.get("/search?q=screens", cookies=cookies)
+        assert "Reading on e-ink" in response.text
+        assert "Why paper-like screens" in response.text
+        assert "1 / 1" in response.text
+
+        response = await client.get("/search?q=nothing", cookies=cookies)
+        assert "No articles match" in response.text
+
+    async def test_requires_user(self, client: AsyncClient):
+        response = await client.get("/search?q=x")
+        assert response.status_code == 302
+
+
+def make_image(width: int, height: int, fmt: str = "PNG") -> bytes:
+    """A colourful test image."""
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class TestImageProxy:
+    async def test_article_images_are_proxied(self, client: AsyncClient, test_db: Database, user_key: str, httpx_mock):
+        await add_articles(test_db, 1)
+        await test_db.connection.execute("UPDATE articles SET link = ?", ("https://example.com/post",))
+        await set_content(test_db, '<p>Photo:</p><img src="/a.png?x=1&amp;y=2" alt="A">')
+        httpx_mock.add_response(url="https://example.com/a.png?x=1&y=2", content=make_image(1200, 800))
+
+        response = await client.get("/article/1", cookies={"user_key": user_key})
+        match = re.search(r'<img src="(/img/[0-9a-f]{32}\?url=[^"]+)" alt="A">', response.text)
+        assert match
+
+        for _ in range(2):
+            response = await client.get(match.group(1))
+            assert response.status_code == 200
+            assert response.headers["Content-Type"] in ("image/png", "image/jpeg")
+            image = Image.open(BytesIO(response.content))
+            assert image.size == (settings.image_max_width, 400)
+            assert image.mode in ("L", "P")
+        # Fetched and converted once, then served from disk
+        assert len(httpx_mock.get_requests()) == 1
+
+    async def test_unsigned_url_is_rejected(self, client: AsyncClient):
+        response = await client.get("/img/0123456789abcdef0123456789abcdef?url=https://example.com/a.png")
+        assert response.status_code == 403
+
+        response = await client.get("/img/%C3%A9?url=https://example.com/a.png")
+        assert response.status_code == 403
+
+    async def test_upstream_failure(self, client: AsyncClient, httpx_mock):
+        httpx_mock.add_response(url="https://example.com/a.png", status_code=404)
+        response = await client.get(images.url("https://example.com/a.png"))
+        assert response.status_code == 502
+
+    def test_small_images_are_not_upscaled(self):
+        data, media_type = convert_image(make_image(100, 50, "JPEG"), max_width=600, quality=70)
+        image = Image.open(BytesIO(data))
+        assert image.size == (100, 50)
+        assert image.format == media_type.removeprefix("image/").upper()
+
+    async def test_cache_evicts_least_recently_served(self, tmp_path: Path, httpx_mock):
+        for name in ("a", "b", "c"):
+            httpx_mock.add_response(url=f"https://example.com/{name}.png", content=make_image(300, 300))
+        proxy = ImageProxy(tmp_path)
+        first, _ = await proxy.get("https://example.com/a.png")
+        proxy.max_bytes = len(first) * 2 + len(first) // 2
+
+        await proxy.get("https://example.com/b.png")
+        await proxy.get("https://example.com/a.png")  # a is now more recent than b
+        await proxy.get("https://example.com/c.png")
+        cached = {path.stem for path in tmp_path.iterdir() if not path.name.startswith(".")}
+        assert len(cached) == 2
+        assert proxy._read(hashlib.sha256(b"https://example.com/b.png").hexdigest()) is None